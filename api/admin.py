@@ -1,21 +1,277 @@
-from django.contrib import admin
+import json
+from collections import defaultdict
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .ai import evaluate_answer
+from .attempts import rescore_attempts
+from .grading import pregrade_batch
+from .mastery import rebuild_topics
 from .models import *
 
-admin.site.register(UserProfile)
-admin.site.register(StudentProfile)
-admin.site.register(TeacherProfile)
-admin.site.register(ParentProfile)
+EXACT_COUNT_LIMIT = 10000  # above this, list pages show the planner's row estimate
+REGRADE_LIMIT = 200  # answers per re-grade action; anything not pre-graded locally costs an LLM call
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts exactly up to EXACT_COUNT_LIMIT rows (a LIMITed subquery, so it
+    stops early) and beyond that uses PostgreSQL's estimate instead of a
+    full COUNT(*): pg_class.reltuples for the whole table, the planner's
+    row estimate for filtered lists.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        exact = queryset[:EXACT_COUNT_LIMIT + 1].count()
+        if exact <= EXACT_COUNT_LIMIT:
+            return exact
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return queryset.count()
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                               [queryset.model._meta.db_table])
+                estimate = cursor.fetchone()[0]
+            else:
+                sql, params = queryset.values('pk').query.sql_with_params()
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                estimate = (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']['Plan Rows']
+        return max(int(estimate), exact)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin for tables with millions of rows: estimated counts, no full-count 'show all' query."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class OpenAttemptFilter(admin.SimpleListFilter):
+    """Attempt state; the open states read the partial indexes on open online and offline attempts."""
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('open', 'In progress'), ('syncing', 'Offline, awaiting upload'),
+            ('expired', 'Expired, not yet swept'), ('completed', 'Completed'),
+        ]
+
+    def queryset(self, request, queryset):
+        now = timezone.now()
+        online = Q(completed_at__isnull=True, sync_deadline__isnull=True)
+        offline = Q(completed_at__isnull=True, sync_deadline__isnull=False)
+        if self.value() == 'open':
+            return queryset.filter(online, expires_at__gt=now)
+        if self.value() == 'syncing':
+            return queryset.filter(offline, sync_deadline__gt=now)
+        if self.value() == 'expired':
+            return queryset.filter((online & Q(expires_at__lte=now)) | (offline & Q(sync_deadline__lte=now)))
+        if self.value() == 'completed':
+            return queryset.filter(completed_at__isnull=False)
+        return queryset
+
+
+# ===== PROFILES =====
+@admin.register(UserProfile)
+class UserProfileAdmin(admin.ModelAdmin):
+    list_display = ['user', 'role', 'created_at']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    list_filter = ['role']
+
+
+class ProfileAdmin(LargeTableAdmin):
+    list_display = ['id', 'user']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    search_fields = ['user__username']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Exact username or id: served by the unique index instead of an ILIKE scan
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)) | queryset.filter(user__username=term), False
+        return queryset.filter(user__username=term), False
+
+
+@admin.register(StudentProfile)
+class StudentProfileAdmin(ProfileAdmin):
+    list_display = ['id', 'user', 'grade', 'total_points', 'current_tier', 'current_streak']
+
+
+@admin.register(TeacherProfile)
+class TeacherProfileAdmin(ProfileAdmin):
+    list_display = ['id', 'user', 'qualification', 'experience_years']
+
+
+@admin.register(ParentProfile)
+class ParentProfileAdmin(ProfileAdmin):
+    raw_id_fields = ['user', 'children']
+
+
+# ===== CURRICULUM =====
 admin.site.register(Subject)
-admin.site.register(Chapter)
-admin.site.register(Topic)
-admin.site.register(Question)
-admin.site.register(MCQOption)
-admin.site.register(QuestionAnswer)
-admin.site.register(Quiz)
-admin.site.register(QuizQuestion)
-admin.site.register(QuizAttempt)
-admin.site.register(StudentQuizAnswer)
-admin.site.register(StudyMaterial)
-admin.site.register(PerformanceAnalytics)
+
+
+@admin.register(Chapter)
+class ChapterAdmin(admin.ModelAdmin):
+    list_display = ['title', 'subject', 'number']
+    list_select_related = ['subject']
+    search_fields = ['title']
+
+
+@admin.register(Topic)
+class TopicAdmin(admin.ModelAdmin):
+    list_display = ['title', 'chapter']
+    list_select_related = ['chapter__subject']
+    search_fields = ['title', 'chapter__title']
+    
+    def get_queryset(self, request):
+        # Also serves topic autocompletes, which render str(topic). A changelist skips
+        # list_select_related when the queryset already selects related rows, so join everything here.
+        return super().get_queryset(request).select_related('chapter__subject')
+
+
+# ===== QUESTIONS =====
+@admin.register(Question)
+class QuestionAdmin(LargeTableAdmin):
+    list_display = ['id', '__str__', 'topic', 'question_type', 'difficulty', 'marks']
+    list_select_related = ['topic__chapter']
+    list_filter = ['question_type', 'difficulty']
+    autocomplete_fields = ['topic']
+    raw_id_fields = ['created_by']
+
+
+@admin.register(MCQOption)
+class MCQOptionAdmin(LargeTableAdmin):
+    list_display = ['id', '__str__', 'question', 'is_correct']
+    list_select_related = ['question']
+    raw_id_fields = ['question']
+
+
+@admin.register(QuestionAnswer)
+class QuestionAnswerAdmin(LargeTableAdmin):
+    list_display = ['id', '__str__']
+    list_select_related = ['question']
+    raw_id_fields = ['question']
+
+
+# ===== QUIZZES =====
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    list_display = ['title', 'chapter', 'time_limit', 'allow_offline', 'passing_percentage', 'created_at']
+    list_select_related = ['chapter__subject']
+    raw_id_fields = ['created_by']
+    search_fields = ['title']
+
+
+@admin.register(QuizQuestion)
+class QuizQuestionAdmin(LargeTableAdmin):
+    list_display = ['id', 'quiz', 'question', 'order']
+    list_select_related = ['quiz', 'question']
+    raw_id_fields = ['quiz', 'question']
+
+
+@admin.register(QuizAttempt)
+class QuizAttemptAdmin(LargeTableAdmin):
+    list_display = ['id', 'student', 'quiz', 'started_at', 'expires_at', 'completed_at', 'score']
+    list_select_related = ['student__user', 'quiz']
+    list_filter = [OpenAttemptFilter]
+    raw_id_fields = ['student', 'quiz']
+    search_fields = ['student__user__username']
+    actions = ['recompute_scores']
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(student__user__username=term), False
+
+    @admin.action(description='Recompute scores of selected completed attempts')
+    def recompute_scores(self, request, queryset):
+        updated = rescore_attempts(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Recomputed {updated} attempt scores.')
+
+
+@admin.register(StudentQuizAnswer)
+class StudentQuizAnswerAdmin(LargeTableAdmin):
+    list_display = ['id', 'attempt', 'question', 'ai_score', 'is_correct']
+    list_select_related = ['attempt__student__user', 'attempt__quiz', 'question']
+    list_filter = ['is_correct']
+    raw_id_fields = ['attempt', 'question']
+    actions = ['regrade']
+
+    @admin.action(description='Re-grade selected answers and rescore their attempts')
+    def regrade(self, request, queryset):
+        answers = list(queryset.select_related('question__answer', 'attempt')[:REGRADE_LIMIT + 1])
+        if len(answers) > REGRADE_LIMIT:
+            self.message_user(request, f'Select at most {REGRADE_LIMIT} answers to re-grade.', messages.ERROR)
+            return
+
+        by_question = defaultdict(list)
+        for answer in answers:
+            by_question[answer.question_id].append(answer)
+        escalated = 0
+        for group in by_question.values():
+            question = group[0].question
+            # Local pre-grading in one pass per question; only the uncertain ones go to the LLM
+            for answer, result in zip(group, pregrade_batch(question, [a.student_answer for a in group])):
+                if result is None:
+                    result = evaluate_answer(question, answer.student_answer)
+                    escalated += 1
+                answer.ai_score = result.get('score', 50)
+                answer.ai_feedback = result.get('feedback', '')
+                answer.is_correct = result.get('is_correct', False)
+        now = timezone.now()
+        for answer in answers:
+            answer.updated_at = now  # bulk_update skips auto_now; item statistics watch this column
+        StudentQuizAnswer.objects.bulk_update(answers, ['ai_score', 'ai_feedback', 'is_correct', 'updated_at'])
+        rescored = rescore_attempts(list({answer.attempt_id for answer in answers}))
+        topics = defaultdict(set)
+        for answer in answers:
+            topics[answer.attempt.student_id].add(answer.question.topic_id)
+        for student_id, topic_ids in topics.items():
+            rebuild_topics(student_id, topic_ids)
+        self.message_user(
+            request,
+            f'Re-graded {len(answers)} answers ({escalated} by the AI provider), rescored {rescored} '
+            f'completed attempts and rebuilt topic mastery of {len(topics)} students.',
+        )
+
+
+# ===== MATERIALS, ANALYTICS, BADGES =====
+@admin.register(StudyMaterial)
+class StudyMaterialAdmin(admin.ModelAdmin):
+    list_display = ['title', 'topic', 'material_type', 'rating', 'preview_ready']
+    list_select_related = ['topic__chapter']
+    list_filter = ['material_type']
+    autocomplete_fields = ['topic']
+
+
+@admin.register(PerformanceAnalytics)
+class PerformanceAnalyticsAdmin(LargeTableAdmin):
+    list_display = ['id', 'student', 'chapter', 'accuracy', 'last_updated']
+    list_select_related = ['student__user', 'chapter__subject']
+    raw_id_fields = ['student']
+
+
 admin.site.register(Badge)
-admin.site.register(StudentBadge)
+
+
+@admin.register(StudentBadge)
+class StudentBadgeAdmin(LargeTableAdmin):
+    list_display = ['id', 'student', 'badge', 'earned_at']
+    list_select_related = ['student__user', 'badge']
+    raw_id_fields = ['student']
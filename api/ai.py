@@ -0,0 +1,102 @@
+import json
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+_provider = None
+_lock = threading.Lock()
+
+
+class GeminiProvider:
+    """Google Gemini. The SDK (grpc/protobuf) is imported on first use, not at startup."""
+
+    def __init__(self):
+        import google.generativeai as genai
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.genai = genai
+
+    def generate(self, prompt):
+        response = self.genai.GenerativeModel(settings.AI_MODEL).generate_content(prompt)
+        try:
+            return response.text
+        except ValueError:
+            # Blocked or empty candidates: let the caller fall back to its default
+            return ''
+
+
+class OfflineProvider:
+    """Returns no text, so callers use their fallbacks. For local development without an API key."""
+
+    def generate(self, prompt):
+        return ''
+
+
+def get_provider():
+    """The provider named by settings.AI_PROVIDER, created once per process on first use."""
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                _provider = import_string(settings.AI_PROVIDER)()
+    return _provider
+
+
+def _reset_provider(setting, **kwargs):
+    global _provider
+    if setting in ('AI_PROVIDER', 'AI_MODEL', 'GEMINI_API_KEY'):
+        _provider = None
+
+
+setting_changed.connect(_reset_provider)
+
+
+def evaluate_answer(question, student_answer):
+    """Grade one answer with the AI provider; returns {'score', 'feedback', 'is_correct'}."""
+    answer = question.answer
+
+    prompt = f"""
+    Question: {question.question_text}
+    Model Answer: {answer.correct_answer}
+    Student Answer: {student_answer}
+
+    Evaluate the student's answer and provide:
+    1. A score from 0-100
+    2. Feedback
+    3. Whether it's correct (true/false)
+
+    Respond in JSON format:
+    {{"score": 85, "feedback": "Good answer", "is_correct": true}}
+    """
+
+    text = get_provider().generate(prompt)
+    try:
+        return json.loads(text)
+    except:
+        return {'score': 50, 'feedback': 'Answer evaluated', 'is_correct': False}
+
+
+def generate_questions(text_content, difficulty):
+    """Ask the AI provider for multiple-choice questions; returns a list (empty on failure)."""
+    prompt = f"""
+    Generate 5 multiple-choice questions from this content:
+
+    {text_content}
+
+    Difficulty: {difficulty}
+
+    For each question provide:
+    - Question text
+    - 4 options (A, B, C, D)
+    - Correct answer
+    - Explanation
+
+    Return as JSON array.
+    """
+
+    text = get_provider().generate(prompt)
+    try:
+        return json.loads(text)
+    except:
+        return []
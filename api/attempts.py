@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+
+from eldas.db_router import primary_only
+
+from .dashboard import invalidate_dashboards
+from .models import QuizAttempt, QuizQuestion, StudentQuizAnswer
+from .rollups import update_rollups
+
+
+def score_expression():
+    """
+    An attempt's percentage as a SQL expression: sum of ai_score over
+    (questions in the quiz * 100), 0 for an empty quiz. Same formula
+    complete_quiz has always used, but evaluated for many rows in one UPDATE.
+    """
+    total_score = (
+        StudentQuizAnswer.objects.filter(attempt=OuterRef('pk'))
+        .values('attempt').annotate(total=Sum('ai_score')).values('total')
+    )
+    total_marks = (
+        QuizQuestion.objects.filter(quiz=OuterRef('quiz'))
+        .values('quiz').annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(
+        Coalesce(Subquery(total_score, output_field=FloatField()), Value(0.0))
+        / Cast(NullIf(Subquery(total_marks), Value(0)), FloatField()),
+        Value(0.0),
+    )
+
+
+def expiry_for(quiz, started_at=None):
+    return (started_at or timezone.now()) + timedelta(minutes=quiz.time_limit)
+
+
+def complete_attempts(queryset, completed_at):
+    """Score and close every open attempt in ``queryset`` with one UPDATE."""
+    return queryset.filter(completed_at__isnull=True).update(
+        score=score_expression(), completed_at=completed_at,
+    )
+
+
+def sweep_expired_attempts(now=None, batch_size=None):
+    """
+    Complete open attempts past their time limit plus the submit grace, and
+    offline attempts past their sync deadline plus the grace.
+
+    Candidates come from the partial indexes on open attempts; each batch is
+    closed at its own expiry time. Returns how many were completed.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.SWEEPER_BATCH_SIZE
+    cutoff = now - timedelta(seconds=settings.QUIZ_SUBMIT_GRACE_SECONDS)
+    open_attempts = QuizAttempt.objects.filter(completed_at__isnull=True)
+    return (
+        _sweep(open_attempts.filter(sync_deadline__isnull=True, expires_at__lte=cutoff), 'expires_at', batch_size)
+        + _sweep(open_attempts.filter(sync_deadline__lte=cutoff), 'sync_deadline', batch_size)
+    )
+
+
+def _sweep(candidates, order_by, batch_size):
+    completed = 0
+    while True:
+        rows = list(candidates.order_by(order_by).values_list('pk', 'student_id')[:batch_size])
+        if not rows:
+            return completed
+        ids = [pk for pk, _ in rows]
+        # completed_at__isnull is re-checked in the UPDATE, so a concurrent complete_quiz wins
+        completed += complete_attempts(QuizAttempt.objects.filter(pk__in=ids), F('expires_at'))
+        update_rollups(ids)
+        invalidate_dashboards(student_id for _, student_id in rows)
+        if len(rows) < batch_size:
+            return completed
+
+
+def rescore_attempts(attempt_ids):
+    """Recompute the scores of completed attempts (e.g. after re-grading) and what is derived from them."""
+    attempts = QuizAttempt.objects.filter(pk__in=attempt_ids, completed_at__isnull=False)
+    with primary_only():
+        students = set(attempts.values_list('student_id', flat=True))
+    updated = attempts.update(score=score_expression())
+    update_rollups(attempt_ids)
+    invalidate_dashboards(students)
+    return updated
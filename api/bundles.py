@@ -0,0 +1,201 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from eldas.db_router import primary_only
+
+from .ai import evaluate_answer
+from .attempts import rescore_attempts
+from .grading import pregrade
+from .mastery import rebuild_topics
+from .models import MCQOption, Question, QuizQuestion, StudentQuizAnswer
+
+TOKEN_SALT = 'api.bundles.attempt'
+
+_executor = ThreadPoolExecutor(max_workers=settings.SYNC_GRADING_WORKERS, thread_name_prefix='sync-grading')
+
+
+class BundleError(Exception):
+    """A sync upload that cannot be accepted; the message is safe to show the client."""
+
+
+def attempt_token(attempt, question_ids):
+    """Signed, compressed claims naming the attempt, its student and the questions it was handed."""
+    claims = {'a': attempt.pk, 's': attempt.student_id, 'q': question_ids}
+    return signing.dumps(claims, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token, attempt):
+    """The question ids a token allows for ``attempt``; BundleError if forged or issued for another attempt."""
+    try:
+        claims = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise BundleError('Invalid attempt token')
+    if claims.get('a') != attempt.pk or claims.get('s') != attempt.student_id:
+        raise BundleError('Token was issued for another attempt')
+    return set(claims.get('q', []))
+
+
+def build_bundle(attempt):
+    """
+    Everything needed to take ``attempt`` offline, in two queries: questions
+    in quiz order and their MCQ options, without correct answers or
+    explanations, plus the attempt token the sync upload must carry.
+    """
+    links = QuizQuestion.objects.filter(quiz_id=attempt.quiz_id).select_related('question')
+    questions = [link.question for link in links]
+    options = {}
+    for option_id, question_id, text in (
+        MCQOption.objects.filter(question__in=[q.pk for q in questions])
+        .order_by('id').values_list('id', 'question_id', 'option_text')
+    ):
+        options.setdefault(question_id, []).append({'id': option_id, 'text': text})
+
+    return {
+        'attempt_id': attempt.pk,
+        'quiz_id': attempt.quiz_id,
+        'expires_at': attempt.expires_at,
+        'sync_deadline': attempt.sync_deadline,
+        'questions': [
+            {
+                'id': question.pk,
+                'text': question.question_text,
+                'type': question.question_type,
+                'marks': question.marks,
+                'options': options.get(question.pk, []),
+            }
+            for question in questions
+        ],
+        'token': attempt_token(attempt, [q.pk for q in questions]),
+    }
+
+
+def prepare_answers(attempt, allowed, answers):
+    """
+    Parse an upload of ``[{'question_id', 'answer'}]`` and grade what can be
+    graded without the AI provider.
+
+    Returns ``[(question, student_answer, result, changed)]``; ``result`` is
+    None where the answer needs the LLM. Answers already graded with the same
+    text are replayed and, like answers already waiting for the LLM, are
+    reported unchanged.
+    """
+    by_question = {}
+    for item in answers:
+        try:
+            question_id = int(item['question_id'])
+        except (KeyError, TypeError, ValueError):
+            raise BundleError('Every answer needs a question_id')
+        if question_id not in allowed:
+            raise BundleError(f'Question {question_id} is not part of this attempt')
+        by_question[question_id] = str(item.get('answer', ''))  # the last answer to a question wins
+
+    questions = Question.objects.select_related('answer').in_bulk(list(by_question))
+    if len(questions) < len(by_question):
+        raise BundleError('Some questions of this attempt no longer exist')
+    existing = {
+        answer.question_id: answer
+        for answer in StudentQuizAnswer.objects.filter(attempt=attempt, question_id__in=list(by_question))
+    }
+
+    prepared = []
+    for question_id, student_answer in by_question.items():
+        question = questions[question_id]
+        stored = existing.get(question_id)
+        if stored and stored.student_answer == student_answer:
+            if stored.ai_score is not None:
+                result = {'score': stored.ai_score, 'feedback': stored.ai_feedback, 'is_correct': stored.is_correct}
+                prepared.append((question, student_answer, result, False))
+                continue
+            if stored.is_correct is None:
+                prepared.append((question, student_answer, None, False))
+                continue
+        prepared.append((question, student_answer, pregrade(question, student_answer), True))
+    return prepared
+
+
+def store_answers(attempt, prepared):
+    """
+    Write the changed answers of a prepared upload in one upsert. Answers that
+    need the LLM are stored ungraded and graded by the worker pool after
+    commit. Returns one result per answer, ``{'question_id', 'pending': True}``
+    for those still waiting.
+    """
+    rows, results, pending = [], [], []
+    for question, student_answer, result, changed in prepared:
+        if result is None:
+            pending.append(question.pk)
+            results.append({'question_id': question.pk, 'pending': True})
+            grade = {'ai_score': None, 'ai_feedback': '', 'is_correct': None}
+        else:
+            results.append({'question_id': question.pk, **result})
+            grade = {
+                'ai_score': result.get('score', 50),
+                'ai_feedback': result.get('feedback', ''),
+                'is_correct': result.get('is_correct', False),
+            }
+        if changed:
+            rows.append(StudentQuizAnswer(attempt=attempt, question=question, student_answer=student_answer, **grade))
+
+    with transaction.atomic():
+        StudentQuizAnswer.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['attempt', 'question'],
+            update_fields=['student_answer', 'ai_score', 'ai_feedback', 'is_correct', 'updated_at'],
+        )
+        # Rebuilt rather than appended: some of these answers may replace ones already observed
+        rebuild_topics(attempt.student_id, {row.question.topic_id for row in rows})
+        if pending:
+            answer_ids = list(
+                StudentQuizAnswer.objects.filter(attempt=attempt, question_id__in=pending).values_list('id', flat=True)
+            )
+            transaction.on_commit(lambda: _executor.submit(_grade_in_worker, answer_ids))
+    return results
+
+
+def _grade_in_worker(answer_ids):
+    close_old_connections()
+    try:
+        with primary_only():
+            grade_pending(answer_ids)
+    finally:
+        close_old_connections()
+
+
+def grade_pending(answer_ids):
+    """
+    Grade stored answers still waiting for the AI provider, with the same
+    evaluate_answer call submit_answer makes, then fold them into mastery and
+    rescore completed attempts. An answer changed or graded meanwhile is left
+    alone; one whose provider call fails stays pending for
+    grade_pending_answers to retry. Returns how many were graded.
+    """
+    answers = StudentQuizAnswer.objects.filter(
+        pk__in=answer_ids, ai_score__isnull=True, is_correct__isnull=True,
+    ).select_related('question__answer', 'attempt')
+    graded = []
+    for answer in answers:
+        try:
+            result = evaluate_answer(answer.question, answer.student_answer)
+        except Exception:
+            continue
+        if StudentQuizAnswer.objects.filter(
+            pk=answer.pk, student_answer=answer.student_answer, ai_score__isnull=True, is_correct__isnull=True,
+        ).update(
+            ai_score=result.get('score', 50),
+            ai_feedback=result.get('feedback', ''),
+            is_correct=result.get('is_correct', False),
+            updated_at=timezone.now(),
+        ):
+            graded.append(answer)
+
+    topics = defaultdict(set)
+    for answer in graded:
+        topics[answer.attempt.student_id].add(answer.question.topic_id)
+    for student_id, topic_ids in topics.items():
+        rebuild_topics(student_id, topic_ids)
+    rescore_attempts({answer.attempt_id for answer in graded})
+    return len(graded)
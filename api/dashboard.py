@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+
+from eldas.db_router import primary_only
+
+from .models import Quiz, QuizAttempt, StudentBadge, StudentProfile
+from .serializers import StudentProfileSerializer
+
+RECENT_ATTEMPTS = 5
+RECENT_BADGES = 5
+PASSED = Q(score__gte=F('quiz__passing_percentage'))
+
+
+def dashboard_key(student_id):
+    return f'dashboard:student:{student_id}'
+
+
+def build_dashboard(student):
+    """
+    The student dashboard payload: the profile plus recent attempts, pass
+    rate, per-chapter progress and recent badges. Always four queries
+    (recent attempts, chapter rollup, quizzes per chapter, badges) however
+    many attempts the student has; load ``student`` with
+    select_related('user__profile') so serializing it adds none.
+    """
+    completed = QuizAttempt.objects.filter(student=student, completed_at__isnull=False)
+
+    recent_attempts = list(
+        QuizAttempt.objects.filter(student=student)
+        .order_by('-started_at')
+        .values(
+            'id', 'quiz_id', 'started_at', 'completed_at', 'score',
+            quiz_title=F('quiz__title'),
+            passing_percentage=F('quiz__passing_percentage'),
+        )[:RECENT_ATTEMPTS]
+    )
+    for attempt in recent_attempts:
+        passing = attempt.pop('passing_percentage')
+        attempt['passed'] = None if attempt['score'] is None else attempt['score'] >= passing
+
+    chapters = list(
+        completed.order_by()
+        .values(chapter_id=F('quiz__chapter'), chapter_title=F('quiz__chapter__title'),
+                subject_name=F('quiz__chapter__subject__name'))
+        .annotate(
+            attempts=Count('pk'),
+            passed_attempts=Count('pk', filter=PASSED),
+            quizzes_passed=Count('quiz', filter=PASSED, distinct=True),
+            best_score=Max('score'),
+            total_score=Sum('score'),
+        )
+        .order_by('chapter_id')
+    )
+    quiz_counts = dict(
+        Quiz.objects.filter(chapter__in=[row['chapter_id'] for row in chapters])
+        .order_by().values('chapter').annotate(n=Count('pk')).values_list('chapter', 'n')
+    )
+
+    attempts = passed = 0
+    total_score = 0.0
+    for row in chapters:
+        attempts += row['attempts']
+        passed += row.pop('passed_attempts')
+        total_score += row.pop('total_score') or 0
+        row['total_quizzes'] = quiz_counts.get(row['chapter_id'], 0)
+        row['progress'] = row['quizzes_passed'] / row['total_quizzes'] * 100 if row['total_quizzes'] else 0
+
+    badges = list(
+        StudentBadge.objects.filter(student=student)
+        .order_by('-earned_at')
+        .values('badge_id', 'earned_at', name=F('badge__name'), icon=F('badge__icon'))[:RECENT_BADGES]
+    )
+
+    data = dict(StudentProfileSerializer(student).data)
+    data.update({
+        'stats': {
+            'attempts_completed': attempts,
+            'attempts_passed': passed,
+            'pass_rate': passed / attempts * 100 if attempts else 0,
+            'average_score': total_score / attempts if attempts else 0,
+        },
+        'recent_attempts': recent_attempts,
+        'chapter_progress': chapters,
+        'recent_badges': badges,
+    })
+    return data
+
+
+def get_dashboard(student):
+    """Cached dashboard for ``student``; a miss is rebuilt from the primary."""
+    key = dashboard_key(student.pk)
+    data = cache.get(key)
+    if data is None:
+        with primary_only():
+            data = build_dashboard(student)
+        cache.set(key, data, settings.STUDENT_DASHBOARD_CACHE_TTL)
+    return data
+
+
+def refresh_dashboard(student_id):
+    """Rebuild and store the dashboard once the current transaction commits (write-through)."""
+    def refresh():
+        with primary_only():
+            student = StudentProfile.objects.select_related('user__profile').get(pk=student_id)
+            cache.set(dashboard_key(student_id), build_dashboard(student), settings.STUDENT_DASHBOARD_CACHE_TTL)
+    transaction.on_commit(refresh)
+
+
+def invalidate_dashboards(student_ids):
+    """Drop cached dashboards once the current transaction commits."""
+    keys = [dashboard_key(pk) for pk in set(student_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,195 @@
+import re
+import zlib
+
+import numpy as np
+from django.db import transaction
+
+from .models import MCQOption, Question, QuestionAnswer, QuestionSignature, QuestionLSHBucket
+
+# 128 permutations in 32 bands of 4 rows: pairs above ~0.6 Jaccard almost
+# always share a bucket, pairs below ~0.3 almost never do.
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+
+# Universal hashing (a*x + b) mod p with p < 2**32, so a*x never overflows uint64
+_PRIME = np.uint64(4294967291)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 4294967291, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 4294967291, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_ROW_MULT = _rng.randint(1, 1 << 62, size=ROWS, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.randint(1, 1 << 62, size=BANDS, dtype=np.int64).astype(np.uint64)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def shingles(text):
+    """Hashed word n-grams of the normalised text."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.fromiter((zlib.crc32(g.encode()) for g in set(grams)), dtype=np.uint64) % _PRIME
+
+
+def minhash(text):
+    """MinHash signature of ``text`` as NUM_PERM uint32 values."""
+    values = shingles(text)
+    if values.size == 0:
+        return np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+    hashed = ((_PERM_A[:, None] * values[None, :]) % _PRIME + _PERM_B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signatures):
+    """LSH bucket keys for a (n, NUM_PERM) signature matrix, one int64 per band."""
+    bands = signatures.astype(np.uint64).reshape(len(signatures), BANDS, ROWS)
+    with np.errstate(over='ignore'):
+        keys = (bands * _ROW_MULT).sum(axis=2) ^ _BAND_SALT
+    return keys.view(np.int64)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+def load_signature(raw):
+    return np.frombuffer(bytes(raw), dtype=np.uint32)
+
+
+def index_question(question_id, text):
+    """Store the signature and bucket rows for one question, replacing old ones."""
+    signature = minhash(text)
+    keys = band_keys(signature[None, :])[0]
+    with transaction.atomic():
+        QuestionSignature.objects.update_or_create(
+            question_id=question_id, defaults={'minhash': signature.tobytes()}
+        )
+        QuestionLSHBucket.objects.filter(question_id=question_id).delete()
+        QuestionLSHBucket.objects.bulk_create([
+            QuestionLSHBucket(question_id=question_id, bucket=int(key)) for key in keys
+        ])
+    return signature
+
+
+def find_near_duplicates(text, exclude_id=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    Return [(question_id, similarity), ...] for indexed questions similar to ``text``.
+
+    Only questions sharing an LSH bucket are compared, so the cost depends on
+    the number of candidates rather than the size of the bank.
+    """
+    signature = minhash(text)
+    keys = [int(k) for k in band_keys(signature[None, :])[0]]
+    candidates = (
+        QuestionSignature.objects
+        .filter(question__lsh_buckets__bucket__in=keys)
+        .exclude(question_id=exclude_id)
+        .distinct()
+        .values_list('question_id', 'minhash')
+    )
+    matches = []
+    for question_id, raw in candidates:
+        score = similarity(signature, load_signature(raw))
+        if score >= threshold:
+            matches.append((question_id, score))
+    matches.sort(key=lambda m: -m[1])
+    return matches
+
+
+def describe_duplicates(matches):
+    """Serialise find_near_duplicates() results for API responses."""
+    if not matches:
+        return []
+    texts = dict(Question.objects.filter(id__in=[m[0] for m in matches]).values_list('id', 'question_text'))
+    return [
+        {'id': question_id, 'question_text': texts.get(question_id, '')[:100], 'similarity': round(score, 3)}
+        for question_id, score in matches
+    ]
+
+
+def cluster_signatures(ids, signatures, threshold=DUPLICATE_THRESHOLD):
+    """
+    Group near-duplicate questions in memory.
+
+    ``signatures`` is an (n, NUM_PERM) matrix aligned with ``ids``. Returns a
+    list of clusters (lists of ids, smallest first) with more than one member.
+    """
+    n = len(ids)
+    parent = np.arange(n)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    keys = band_keys(signatures)
+    for band in range(BANDS):
+        order = np.argsort(keys[:, band], kind='stable')
+        sorted_keys = keys[order, band]
+        starts = np.flatnonzero(np.diff(sorted_keys)) + 1
+        for group in np.split(order, starts):
+            if len(group) < 2:
+                continue
+            # Verify against the group head; union-find joins the rest transitively
+            head = group[0]
+            scores = (signatures[group[1:]] == signatures[head]).mean(axis=1)
+            for member in group[1:][scores >= threshold]:
+                parent[find(member)] = find(head)
+
+    clusters = {}
+    for i in range(n):
+        clusters.setdefault(find(i), []).append(ids[i])
+    return [sorted(c) for c in clusters.values() if len(c) > 1]
+
+
+def _normalise(text):
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+def mergeable_groups(clusters, threshold=DUPLICATE_THRESHOLD):
+    """
+    Split text clusters into groups that are safe to merge into one question.
+
+    Similar stems are not enough: members of a group share the owner, topic
+    and question type, have the same options with the same ones marked correct,
+    and have correct answers at least ``threshold`` similar. Returns lists of
+    ids (smallest first) with more than one member.
+    """
+    ids = [question_id for cluster in clusters for question_id in cluster]
+    meta = {
+        pk: (created_by_id, topic_id, question_type)
+        for pk, created_by_id, topic_id, question_type in Question.objects.filter(id__in=ids)
+        .values_list('id', 'created_by_id', 'topic_id', 'question_type')
+    }
+    options = {}
+    for question_id, text, is_correct in MCQOption.objects.filter(question_id__in=ids).values_list(
+            'question_id', 'option_text', 'is_correct'):
+        options.setdefault(question_id, set()).add((_normalise(text), is_correct))
+    answers = {
+        question_id: minhash(text)
+        for question_id, text in QuestionAnswer.objects.filter(question_id__in=ids)
+        .values_list('question_id', 'correct_answer')
+    }
+
+    def same_answer(a, b):
+        if a not in answers or b not in answers:
+            return a not in answers and b not in answers
+        return similarity(answers[a], answers[b]) >= threshold
+
+    groups = []
+    for cluster in clusters:
+        pending = [question_id for question_id in cluster if question_id in meta]
+        while pending:
+            head, rest = pending[0], pending[1:]
+            key = (meta[head], frozenset(options.get(head, ())))
+            group = [q for q in rest if (meta[q], frozenset(options.get(q, ()))) == key and same_answer(head, q)]
+            if group:
+                groups.append([head] + group)
+            pending = [q for q in rest if q not in group]
+    return groups
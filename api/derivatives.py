@@ -0,0 +1,105 @@
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz  # PyMuPDF, renders the first page of PDFs
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from eldas.db_router import primary_only
+
+from .models import StudyMaterial
+
+VARIANTS = {
+    'thumb': (320, 320),
+    'web': (1280, 1280),
+}
+JPEG_QUALITY = 82
+
+_executor = ThreadPoolExecutor(max_workers=settings.DERIVATIVE_WORKERS, thread_name_prefix='derivatives')
+# Striped by hash so the lock table stays fixed-size for the life of the process
+_hash_locks = [threading.Lock() for _ in range(64)]
+
+
+def derivative_name(content_hash, variant):
+    """Content-addressed storage path, shared by every upload of the same file."""
+    return f'derivatives/{content_hash[:2]}/{content_hash}/{variant}.jpg'
+
+
+def schedule_derivatives(material_id):
+    """Build derivatives in the worker pool once the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_run_in_worker, material_id))
+
+
+def _run_in_worker(material_id):
+    close_old_connections()
+    try:
+        with primary_only():
+            build_derivatives(material_id)
+    finally:
+        close_old_connections()
+
+
+def _hash_file(field):
+    digest = hashlib.sha256()
+    with field.storage.open(field.name, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_image(field, material_type):
+    if material_type == 'pdf':
+        with field.storage.open(field.name, 'rb') as f:
+            document = fitz.open(stream=f.read(), filetype='pdf')
+        pixmap = document[0].get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
+        return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+    with field.storage.open(field.name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def build_derivatives(material_id):
+    """
+    Create the thumbnail and web variants for one material.
+
+    Returns True when previews are available. Files whose hash already has
+    derivatives in storage are not decoded again.
+    """
+    material = StudyMaterial.objects.filter(pk=material_id).only('file', 'material_type').first()
+    if material is None or not material.file:
+        return False
+    field = material.file
+    content_hash = _hash_file(field)
+
+    # Same-hash uploads processed at once must not both render the variants
+    with _hash_locks[int(content_hash[:8], 16) % len(_hash_locks)]:
+        ready = all(default_storage.exists(derivative_name(content_hash, v)) for v in VARIANTS)
+        if not ready and material.material_type in ('image', 'pdf'):
+            try:
+                image = _source_image(field, material.material_type)
+            except (OSError, ValueError, RuntimeError, IndexError, Image.DecompressionBombError):
+                image = None
+            if image is not None:
+                image = image.convert('RGB')
+                for variant, size in VARIANTS.items():
+                    name = derivative_name(content_hash, variant)
+                    if default_storage.exists(name):
+                        continue
+                    copy = image.copy()
+                    copy.thumbnail(size, Image.LANCZOS)
+                    buffer = io.BytesIO()
+                    copy.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    default_storage.save(name, ContentFile(buffer.getvalue()))
+                ready = True
+
+    # Guard on the file name so a newer upload is not marked with stale results
+    StudyMaterial.objects.filter(pk=material_id, file=field.name).update(
+        content_hash=content_hash, preview_ready=ready
+    )
+    return ready
@@ -0,0 +1,127 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+CHUNK_SIZE = 256 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header into an inclusive (start, end) pair.
+
+    Returns None when the header is absent or not a single byte range (the
+    caller then serves the whole file) and raises ValueError when the range
+    cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def file_etag(storage, name, size):
+    """Strong ETag from file metadata, so the file is never read to compute it."""
+    try:
+        modified = storage.get_modified_time(name).timestamp()
+    except (NotImplementedError, OSError):
+        modified = ''
+    digest = hashlib.sha1(f'{name}:{size}:{modified}'.encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _read_range(handle, start, length):
+    try:
+        handle.seek(start)
+        while length > 0:
+            data = handle.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        handle.close()
+
+
+def serve_file(request, storage, name):
+    """
+    Stream ``name`` from ``storage`` honouring ETag and Range headers.
+
+    Whole-file responses go through FileResponse so the WSGI server can use
+    sendfile; with MATERIAL_SENDFILE_HEADER set the body is left to the
+    front-end proxy entirely.
+    """
+    size = storage.size(name)
+    etag = file_etag(storage, name, size)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f'private, max-age={settings.MATERIAL_CACHE_MAX_AGE}',
+    }
+    try:
+        headers['Last-Modified'] = http_date(storage.get_modified_time(name).timestamp())
+    except (NotImplementedError, OSError):
+        pass
+
+    if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=304)
+        for key, value in headers.items():
+            response[key] = value
+        return response
+
+    if settings.MATERIAL_SENDFILE_HEADER:
+        # nginx (X-Accel-Redirect) / Apache (X-Sendfile) handle ranges and the copy themselves
+        response = HttpResponse(content_type=content_type)
+        response[settings.MATERIAL_SENDFILE_HEADER] = settings.MATERIAL_SENDFILE_PREFIX + name
+        for key, value in headers.items():
+            response[key] = value
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(storage.open(name, 'rb'), content_type=content_type,
+                                filename=os.path.basename(name))
+        response.block_size = CHUNK_SIZE
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(storage.open(name, 'rb'), start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    for key, value in headers.items():
+        response[key] = value
+    return response
@@ -0,0 +1,138 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .serializers import (
+    MCQOptionSerializer, QuestionAnswerSerializer, QuestionSerializer,
+    QuizAttemptSerializer, StudentQuizAnswerSerializer,
+)
+
+# DRF fields whose to_representation() returns database values unchanged
+PASSTHROUGH = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class FastReadSerializer:
+    """
+    Read-only twin of a ModelSerializer that works on ``.values()`` rows.
+
+    Field conversions are compiled once from ``serializer_class``: columns
+    DRF would return unchanged are copied, the rest reuse the DRF field's own
+    to_representation(), so output matches the ModelSerializer exactly.
+    Nested serializers listed in ``nested`` as ``name: (child class, fk on
+    child, many)`` are fetched with one query per page.
+    """
+    serializer_class = None
+    nested = {}
+
+    def __init__(self):
+        # Compiled once per class, not per request
+        if '_compiled' not in type(self).__dict__:
+            type(self)._compiled = self._compile()
+        self.model, self.columns, self.plan = self._compiled
+
+    @classmethod
+    def _compile(cls):
+        columns = ['pk']
+        plan = []
+        for name, field in cls.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in cls.nested:
+                plan.append((name, None, None))
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+                raise ImproperlyConfigured(f'{cls.__name__}: add {name!r} to nested')
+            column = field.source.replace('.', '__')
+            convert = None if isinstance(field, PASSTHROUGH) else field.to_representation
+            columns.append(column)
+            plan.append((name, column, convert))
+        return cls.serializer_class.Meta.model, columns, plan
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        children = {}
+        if rows:
+            ids = [row['pk'] for row in rows]
+            for name, (child_class, fk, many) in self.nested.items():
+                children[name] = child_class().for_parents(ids, fk, many)
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in self.plan:
+                if column is None:
+                    _, _, many = self.nested[name]
+                    value = children[name].get(row['pk'])
+                    item[name] = (value or []) if many else value
+                    continue
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+    def for_parents(self, parent_ids, fk, many):
+        """{parent id: serialized child (or list of children)} for the given parents."""
+        rows = list(
+            self.model.objects.filter(**{f'{fk}__in': parent_ids})
+            .order_by('pk')
+            .values(*self.columns, fast_parent_id=F(fk))
+        )
+        grouped = {}
+        for row, item in zip(rows, self.serialize(rows)):
+            if many:
+                grouped.setdefault(row['fast_parent_id'], []).append(item)
+            else:
+                grouped[row['fast_parent_id']] = item
+        return grouped
+
+
+class FastListMixin:
+    """Serve ``list`` through ``fast_serializer_class`` instead of the ModelSerializer."""
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        fast = self.fast_serializer_class()
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(queryset))
+
+
+# ===== QUESTIONS =====
+class FastMCQOptionSerializer(FastReadSerializer):
+    serializer_class = MCQOptionSerializer
+
+
+class FastQuestionAnswerSerializer(FastReadSerializer):
+    serializer_class = QuestionAnswerSerializer
+
+
+class FastQuestionSerializer(FastReadSerializer):
+    serializer_class = QuestionSerializer
+    nested = {
+        'options': (FastMCQOptionSerializer, 'question', True),
+        'answer': (FastQuestionAnswerSerializer, 'question', False),
+    }
+
+
+# ===== QUIZ ATTEMPTS =====
+class FastStudentQuizAnswerSerializer(FastReadSerializer):
+    serializer_class = StudentQuizAnswerSerializer
+
+
+class FastQuizAttemptSerializer(FastReadSerializer):
+    serializer_class = QuizAttemptSerializer
+    nested = {
+        'answers': (FastStudentQuizAnswerSerializer, 'attempt', True),
+    }
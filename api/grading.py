@@ -0,0 +1,180 @@
+import hashlib
+import math
+import re
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+POINT_SPLIT_RE = re.compile(r'[\n;]+')
+LIST_MARKER_RE = re.compile(r'^\s*(?:\d+[.)]|[-*•])\s*')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the their this to was were '
+    'which with will can into than then there these those they also such not'.split()
+)
+POINT_COVERED = 0.6  # share of a key point's weighted terms an answer must contain
+MISTAKE_MATCHED = 0.8
+KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def tokenize(text):
+    """Lowercased, crudely stemmed content words."""
+    tokens = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        for suffix in ('ing', 'es', 'ed', 's', 'e'):
+            if len(word) > len(suffix) + 3 and word.endswith(suffix):
+                word = word[:-len(suffix)]
+                break
+        tokens.append(word)
+    return tokens
+
+
+def split_points(text):
+    """Split a key points / mistakes field into items, one per line or semicolon."""
+    points = (LIST_MARKER_RE.sub('', p).strip() for p in POINT_SPLIT_RE.split(text or ''))
+    return [p for p in points if tokenize(p)]
+
+
+class AnswerKey:
+    """
+    Precomputed TF-IDF weights for one question's model answer.
+
+    Each row of ``points`` / ``mistakes`` holds the normalised term weights of
+    one key point / common mistake, so coverage for a batch of answers is a
+    single matrix product.
+    """
+
+    def __init__(self, correct_answer, key_points, common_mistakes):
+        self.point_texts = split_points(key_points)
+        self.mistake_texts = split_points(common_mistakes)
+        docs = [tokenize(t) for t in self.point_texts + self.mistake_texts] + [tokenize(correct_answer)]
+
+        self.vocab = {}
+        for doc in docs:
+            for token in doc:
+                self.vocab.setdefault(token, len(self.vocab))
+        df = np.zeros(len(self.vocab), dtype=np.float32)
+        for doc in docs:
+            for token in set(doc):
+                df[self.vocab[token]] += 1
+        self.idf = np.log((1 + len(docs)) / (1 + df)) + 1
+
+        point_docs = docs[:len(self.point_texts)]
+        mistake_docs = docs[len(self.point_texts):-1]
+        self.points = self._weights(point_docs)
+        self.mistakes = self._weights(mistake_docs)
+        self.answer = self._weights([docs[-1]])[0] if docs[-1] else np.zeros(len(self.vocab), dtype=np.float32)
+
+    def _weights(self, docs):
+        matrix = np.zeros((len(docs), len(self.vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for token in set(doc):
+                matrix[row, self.vocab[token]] = self.idf[self.vocab[token]]
+        totals = matrix.sum(axis=1, keepdims=True)
+        return np.divide(matrix, totals, out=np.zeros_like(matrix), where=totals > 0)
+
+    @property
+    def usable(self):
+        # Too little reference text to judge anything with confidence
+        return len(self.point_texts) >= 2 or int((self.answer > 0).sum()) >= 5
+
+    def presence(self, answers):
+        """Binary (n_answers, vocab) term-presence matrix."""
+        matrix = np.zeros((len(answers), len(self.vocab)), dtype=np.float32)
+        for row, text in enumerate(answers):
+            cols = [self.vocab[t] for t in set(tokenize(text)) if t in self.vocab]
+            matrix[row, cols] = 1
+        return matrix
+
+    def score(self, answers):
+        """
+        Score a batch of answers; returns (scores 0-100, confidences 0-1,
+        covered point mask, matched mistake mask).
+
+        Only two outcomes are trusted: high coverage of the key points, and a
+        low score that matches a listed common mistake. Missing keywords alone
+        is no evidence the answer is wrong (it may be a paraphrase), so every
+        other low score gets zero confidence and goes to the LLM.
+        """
+        present = self.presence(answers)
+        answer_cov = present @ self.answer
+        if len(self.point_texts):
+            covered = (present @ self.points.T) >= POINT_COVERED
+            coverage = covered.mean(axis=1)
+            raw = 0.7 * coverage + 0.3 * answer_cov
+        else:
+            covered = np.zeros((len(answers), 0), dtype=bool)
+            raw = answer_cov
+        if len(self.mistakes):
+            mistaken = (present @ self.mistakes.T) >= MISTAKE_MATCHED
+            raw = raw - 0.15 * mistaken.any(axis=1)
+        else:
+            mistaken = np.zeros((len(answers), 0), dtype=bool)
+        scores = np.clip(raw, 0, 1) * 100
+        # Confident only well away from the pass mark; borderline answers go to the LLM
+        confidences = np.clip(np.abs(scores - 50) / 40, 0, 1)
+        confidences[(scores < 50) & ~mistaken.any(axis=1)] = 0
+        return scores, confidences, covered, mistaken
+
+
+def _key_digest(answer):
+    text = '\x1f'.join([answer.correct_answer, answer.key_points, answer.common_mistakes])
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def get_answer_key(question):
+    """AnswerKey for ``question``, cached until its QuestionAnswer text changes."""
+    answer = question.answer
+    cache_key = f'pregrader:v2:{question.pk}:{_key_digest(answer)}'
+    key = cache.get(cache_key)
+    if key is None:
+        key = AnswerKey(answer.correct_answer, answer.key_points, answer.common_mistakes)
+        cache.set(cache_key, key, KEY_CACHE_TIMEOUT)
+    return key
+
+
+def pregrade_batch(question, student_answers):
+    """
+    Grade answers to one question locally in a single vectorised pass.
+
+    Returns one result dict per answer, or None where the local score is not
+    confident enough and the answer should be escalated to the LLM.
+    """
+    if question.question_type != 'short' or not hasattr(question, 'answer'):
+        return [None] * len(student_answers)
+    key = get_answer_key(question)
+    if not key.usable:
+        return [None] * len(student_answers)
+
+    scores, confidences, covered, mistaken = key.score([a or '' for a in student_answers])
+    threshold = settings.PREGRADER_CONFIDENCE_THRESHOLD
+    results = []
+    for i in range(len(student_answers)):
+        if confidences[i] < threshold:
+            results.append(None)
+            continue
+        score = int(math.floor(scores[i] + 0.5))
+        missing = [p for p, hit in zip(key.point_texts, covered[i]) if not hit]
+        mistakes = [m for m, hit in zip(key.mistake_texts, mistaken[i]) if hit]
+        if score < 50 and mistakes:
+            feedback = 'This looks like a common mistake: ' + '; '.join(mistakes[:2])
+        elif not key.point_texts:
+            feedback = 'Matches the model answer.' if score >= 50 else 'Does not match the model answer.'
+        elif missing:
+            feedback = f"Covered {len(key.point_texts) - len(missing)} of {len(key.point_texts)} key points. Missing: " + '; '.join(missing[:3])
+        else:
+            feedback = 'Covered all key points.'
+        results.append({
+            'score': score,
+            'feedback': feedback,
+            'is_correct': score >= 50,
+            'graded_by': 'local',
+        })
+    return results
+
+
+def pregrade(question, student_answer):
+    return pregrade_batch(question, [student_answer])[0]
@@ -0,0 +1,85 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+POLL_INTERVAL = 0.25
+
+
+def request_key(request, scope, *parts):
+    """
+    Build the idempotency key for a request.
+
+    A client-supplied ``Idempotency-Key`` header wins; otherwise the key is
+    derived from ``parts`` so concurrent identical requests still collapse
+    onto the first one while it is in flight.
+    """
+    header = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+    if header:
+        return f"{scope}:key:{header}"[:255], True
+    digest = hashlib.sha256('\x1f'.join(str(p) for p in parts).encode()).hexdigest()
+    return f"{scope}:auto:{digest}", False
+
+
+def run_idempotent(request, key, handler, keep_response=True):
+    """
+    Run ``handler()`` at most once per (user, key).
+
+    Duplicates that arrive while the first call is in flight wait for it and
+    replay its response. With ``keep_response`` the response is stored and
+    replayed to later retries too; otherwise the key is released when the
+    call finishes and later retries run the handler again.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(user=request.user, key=key)
+            break
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is None:
+            continue
+        if record.state == IdempotencyKey.DONE:
+            if record.created_at >= timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL):
+                return Response(record.response_body, status=record.response_status)
+            # Past its TTL: the purge has not caught up yet, but the stored response is no longer replayed
+            IdempotencyKey.objects.filter(pk=record.pk, state=IdempotencyKey.DONE).delete()
+            continue
+        if record.created_at < timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_STALE_AFTER):
+            # The worker holding this key died mid-request; take it over.
+            IdempotencyKey.objects.filter(pk=record.pk, state=IdempotencyKey.PENDING).delete()
+            continue
+        if time.monotonic() >= deadline:
+            return Response(
+                {'error': 'A request with this key is still in progress'},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Retry-After': str(settings.IDEMPOTENCY_WAIT_TIMEOUT)},
+            )
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        response = handler()
+    except Exception:
+        record.delete()
+        raise
+
+    if keep_response and response.status_code < 500:
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            state=IdempotencyKey.DONE,
+            response_status=response.status_code,
+            response_body=response.data,
+        )
+    else:
+        record.delete()
+    return response
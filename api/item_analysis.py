@@ -0,0 +1,145 @@
+from collections import Counter
+
+import numpy as np
+from django.utils import timezone
+
+from .models import ItemStatistics, ItemStatisticsRun, MCQOption, StudentQuizAnswer
+
+QUESTION_CHUNK = 200
+ANSWER_CHUNK = 5000
+
+
+def stale_questions(since=None):
+    """
+    Ids of questions with an answer added, re-submitted or re-graded, or in
+    an attempt completed (discrimination needs its score), after ``since``;
+    every answered question when ``since`` is None. Both lookups are range
+    scans on the updated_at and completed_at indexes.
+    """
+    answers = StudentQuizAnswer.objects.order_by()
+    if since is None:
+        return list(answers.values_list('question_id', flat=True).distinct())
+    changed = set(answers.filter(updated_at__gt=since).values_list('question_id', flat=True).distinct())
+    changed.update(
+        answers.filter(attempt__completed_at__gt=since).values_list('question_id', flat=True).distinct()
+    )
+    return sorted(changed)
+
+
+def refresh_item_stats(full=False):
+    """
+    Recompute the stats of questions changed since the last finished run, or
+    of every answered question. Returns the number of rows written.
+    """
+    last_run = ItemStatisticsRun.objects.first()
+    since = None if full or last_run is None else last_run.started_at
+    # Taken before reading, so changes made during this run are picked up by the next one
+    started_at = timezone.now()
+    written = compute_item_stats(stale_questions(since))
+    ItemStatisticsRun.objects.update_or_create(pk=1, defaults={'started_at': started_at, 'questions': written})
+    return written
+
+
+def _option_lookup(question_ids):
+    # Answers to MCQs may hold the option id or the option text
+    lookup = {}
+    for option_id, question_id, text in MCQOption.objects.filter(
+        question_id__in=question_ids
+    ).values_list('id', 'question_id', 'option_text'):
+        lookup[(question_id, str(option_id))] = option_id
+        lookup[(question_id, text.strip().lower())] = option_id
+    return lookup
+
+
+def _group_stats(index, n_groups, correct, ai_score, total):
+    """Vectorised per-question statistics; every argument is aligned per answer."""
+    def group_sum(mask, weights=None):
+        w = None if weights is None else weights[mask]
+        return np.bincount(index[mask], weights=w, minlength=n_groups)
+
+    responses = np.bincount(index, minlength=n_groups)
+
+    graded = ~np.isnan(correct)
+    n_graded = group_sum(graded)
+    n_correct = group_sum(graded, correct)
+
+    scored = ~np.isnan(ai_score)
+    avg_ai = group_sum(scored, ai_score) / np.maximum(group_sum(scored), 1)
+    avg_ai[group_sum(scored) == 0] = np.nan
+
+    # Point-biserial: (mean total of correct - mean total of incorrect) / sd * sqrt(p q)
+    both = graded & ~np.isnan(total)
+    n = group_sum(both)
+    sum_x = group_sum(both, total)
+    sum_x2 = group_sum(both, total * total)
+    n1 = group_sum(both, correct)
+    sum_x1 = group_sum(both, total * np.nan_to_num(correct))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = n_correct / n_graded
+        p_both = n1 / n
+        mean1 = sum_x1 / n1
+        mean0 = (sum_x - sum_x1) / (n - n1)
+        sd = np.sqrt(np.maximum(sum_x2 / n - (sum_x / n) ** 2, 0))
+        r_pb = (mean1 - mean0) / sd * np.sqrt(p_both * (1 - p_both))
+    r_pb[(sd == 0) | (n1 == 0) | (n1 == n)] = np.nan
+    return responses, p, r_pb, avg_ai
+
+
+def _nullable(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def compute_item_stats(question_ids):
+    """Recompute ItemStatistics for ``question_ids``; returns the number of rows written."""
+    written = 0
+    question_ids = sorted(question_ids)
+    for start in range(0, len(question_ids), QUESTION_CHUNK):
+        chunk = question_ids[start:start + QUESTION_CHUNK]
+        position = {qid: i for i, qid in enumerate(chunk)}
+        # Taken before reading, so changes made while this chunk is read mark it stale again
+        computed_at = timezone.now()
+        options = _option_lookup(chunk)
+
+        index, correct, ai_score, total = [], [], [], []
+        distractors = {qid: Counter() for qid in chunk}
+        rows = StudentQuizAnswer.objects.filter(question_id__in=chunk).values_list(
+            'question_id', 'is_correct', 'ai_score', 'attempt__score', 'student_answer'
+        )
+        for question_id, is_correct, score, attempt_score, text in rows.iterator(chunk_size=ANSWER_CHUNK):
+            index.append(position[question_id])
+            correct.append(np.nan if is_correct is None else float(is_correct))
+            ai_score.append(np.nan if score is None else score)
+            total.append(np.nan if attempt_score is None else attempt_score)
+            choice = text.strip()
+            option_id = options.get((question_id, choice)) or options.get((question_id, choice.lower()))
+            if option_id:
+                distractors[question_id][option_id] += 1
+
+        if not index:
+            continue
+        responses, p, r_pb, avg_ai = _group_stats(
+            np.array(index), len(chunk),
+            np.array(correct, dtype=float), np.array(ai_score, dtype=float), np.array(total, dtype=float),
+        )
+        stats = [
+            ItemStatistics(
+                question_id=qid,
+                responses=int(responses[i]),
+                p_value=_nullable(p[i]),
+                discrimination=_nullable(r_pb[i]),
+                avg_ai_score=_nullable(avg_ai[i]),
+                distractors={str(k): v for k, v in distractors[qid].items()},
+                computed_at=computed_at,
+            )
+            for qid, i in position.items()
+            if responses[i]
+        ]
+        ItemStatistics.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['question'],
+            update_fields=['responses', 'p_value', 'discrimination', 'avg_ai_score',
+                           'distractors', 'computed_at', 'updated_at'],
+        )
+        written += len(stats)
+    return written
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.models import StudentProfile
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild day/week progress rollups from quiz attempts, a chunk of students at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200, help='Students per transaction')
+        parser.add_argument('--start-after', type=int, default=0,
+                            help='Resume after this student id (printed as each chunk commits)')
+
+    def handle(self, *args, **options):
+        last_id = options['start_after']
+        students = buckets = 0
+        while True:
+            ids = list(
+                StudentProfile.objects.filter(pk__gt=last_id)
+                .order_by('pk').values_list('pk', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            buckets += rebuild_rollups(ids)
+            students += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f'  up to student {last_id}: {students} students, {buckets} buckets')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} buckets for {students} students'))
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from api.downloads import serve_file
+
+
+class Command(BaseCommand):
+    help = 'Measure study material download throughput for whole-file and ranged responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=256)
+        parser.add_argument('--range-mb', type=int, default=16, help='Size of each ranged (seek) request')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        size = options['size_mb'] * 1024 * 1024
+        span = min(options['range_mb'] * 1024 * 1024, size)
+        factory = RequestFactory()
+
+        with tempfile.TemporaryDirectory() as root:
+            storage = FileSystemStorage(location=root)
+            with open(os.path.join(root, 'bench.bin'), 'wb') as f:
+                block = os.urandom(1024 * 1024)
+                for _ in range(options['size_mb']):
+                    f.write(block)
+
+            cases = [
+                ('full file', {}),
+                ('range from middle', {'HTTP_RANGE': f'bytes={size // 2}-{size // 2 + span - 1}'}),
+                ('range suffix', {'HTTP_RANGE': f'bytes=-{span}'}),
+            ]
+            for label, headers in cases:
+                best = None
+                for _ in range(options['repeat']):
+                    request = factory.get('/bench', **headers)
+                    started = time.perf_counter()
+                    response = serve_file(request, storage, 'bench.bin')
+                    sent = sum(len(chunk) for chunk in response.streaming_content)
+                    response.close()
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                rate = sent / best / (1024 * 1024)
+                self.stdout.write(f'{label:<18} {response.status_code} {sent / 1024 / 1024:8.1f} MiB  {rate:8.1f} MiB/s')
@@ -0,0 +1,110 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import FastQuestionSerializer, FastQuizAttemptSerializer
+from api.models import (
+    Chapter, MCQOption, Question, QuestionAnswer, Quiz, QuizAttempt, StudentProfile,
+    StudentQuizAnswer, Subject, Topic,
+)
+from api.renderers import FastJSONRenderer
+from api.serializers import QuestionSerializer, QuizAttemptSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/s of the DRF list serializers against the fast read path and check the bytes match.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', action='store_true',
+                            help='Create synthetic rows for the run (rolled back afterwards)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self._seed(options['rows'])
+            rows = options['rows']
+            self._compare(
+                'questions',
+                Question.objects.order_by('pk')[:rows],
+                QuestionSerializer, FastQuestionSerializer,
+                lambda qs: qs.prefetch_related('options', 'answer'),
+                options['repeat'],
+            )
+            self._compare(
+                'quiz attempts',
+                QuizAttempt.objects.order_by('pk')[:rows],
+                QuizAttemptSerializer, FastQuizAttemptSerializer,
+                lambda qs: qs.prefetch_related('answers'),
+                options['repeat'],
+            )
+            transaction.set_rollback(True)
+
+    def _time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def _compare(self, label, queryset, serializer_class, fast_class, prefetch, repeat):
+        count = queryset.count()
+        if not count:
+            self.stdout.write(f'{label}: no rows (use --seed)')
+            return
+
+        drf_time, drf_data = self._time(lambda: serializer_class(queryset.all(), many=True).data, repeat)
+        prefetch_time, _ = self._time(lambda: serializer_class(prefetch(queryset.all()), many=True).data, repeat)
+        fast = fast_class()
+        fast_time, fast_data = self._time(lambda: fast.serialize(fast.values(queryset.all())), repeat)
+
+        json_time, expected = self._time(lambda: JSONRenderer().render(drf_data), repeat)
+        fast_json_time, actual = self._time(lambda: FastJSONRenderer().render(fast_data), repeat)
+        if expected != actual:
+            raise CommandError(f'{label}: fast output differs from the DRF serializer')
+
+        self.stdout.write(f'{label} ({count} rows, {len(actual)} bytes, output identical)')
+        for name, seconds in [
+            ('DRF serializer', drf_time),
+            ('DRF + prefetch', prefetch_time),
+            ('fast serializer', fast_time),
+            ('JSONRenderer', json_time),
+            ('FastJSONRenderer', fast_json_time),
+        ]:
+            self.stdout.write(f'  {name:<18} {count / seconds:12,.0f} rows/s')
+
+    def _seed(self, rows):
+        subject = Subject.objects.create(name='Bench', description='Benchmark data')
+        chapter = Chapter.objects.create(subject=subject, number=1, title='Bench', description='')
+        topic = Topic.objects.create(chapter=chapter, title='Bench')
+        first = Question.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        Question.objects.bulk_create([
+            Question(topic=topic, question_text=f'Benchmark question {i} – “quoted” text', question_type='mcq',
+                     difficulty='easy', marks=1)
+            for i in range(rows)
+        ])
+        questions = list(Question.objects.filter(pk__gt=first).values_list('pk', flat=True))
+        MCQOption.objects.bulk_create([
+            MCQOption(question_id=q, option_text=f'Option {j}', is_correct=j == 0)
+            for q in questions for j in range(4)
+        ])
+        QuestionAnswer.objects.bulk_create([
+            QuestionAnswer(question_id=q, correct_answer='Option 0', explanation='Because.')
+            for q in questions[::2]
+        ])
+
+        user = User.objects.create_user(f'bench-{time.time_ns()}')
+        student = StudentProfile.objects.create(user=user)
+        quiz = Quiz.objects.create(title='Bench', chapter=chapter, time_limit=10)
+        QuizAttempt.objects.bulk_create([QuizAttempt(student=student, quiz=quiz, score=i % 100) for i in range(rows)])
+        attempts = list(QuizAttempt.objects.filter(student=student).values_list('pk', flat=True))
+        StudentQuizAnswer.objects.bulk_create([
+            StudentQuizAnswer(attempt_id=a, question_id=q, student_answer='Option 1', ai_score=37.5, is_correct=False)
+            for a in attempts for q in questions[:3]
+        ])
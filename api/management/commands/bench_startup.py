@@ -0,0 +1,73 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a gunicorn worker does before serving its first request
+WORKER_BOOT = """
+import resource, sys
+from eldas.wsgi import application
+import eldas.urls
+print('RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+print('MODULES', ' '.join(sys.modules))
+"""
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure worker startup cost (python -X importtime, peak RSS) and fail if heavy '
+        'modules are imported at startup or limits are exceeded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Show the N slowest top-level imports')
+        parser.add_argument('--forbid', default='google.generativeai,grpc',
+                            help='Comma-separated modules that must not be imported at startup')
+        parser.add_argument('--max-import-ms', type=float, default=None)
+        parser.add_argument('--max-rss-mb', type=float, default=None)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'eldas.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER_BOOT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Worker boot failed:\n{result.stderr[-2000:]}')
+
+        total_us = 0
+        top_level = []
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            total_us += int(self_us)
+            if len(indent) == 1:
+                top_level.append((int(cumulative_us), name))
+
+        stdout = dict(line.split(' ', 1) for line in result.stdout.splitlines() if ' ' in line)
+        rss_mb = int(stdout['RSS_KB']) / 1024
+        modules = set(stdout['MODULES'].split())
+        import_ms = total_us / 1000
+
+        self.stdout.write(f'Import time: {import_ms:.0f} ms across {len(modules)} modules')
+        self.stdout.write(f'Peak RSS:    {rss_mb:.1f} MiB')
+        for cumulative_us, name in sorted(top_level, reverse=True)[:options['top']]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {name}')
+
+        failures = []
+        for name in filter(None, options['forbid'].split(',')):
+            if name.strip() in modules:
+                failures.append(f'{name.strip()} is imported at startup')
+        if options['max_import_ms'] is not None and import_ms > options['max_import_ms']:
+            failures.append(f'import time {import_ms:.0f} ms exceeds {options["max_import_ms"]:.0f} ms')
+        if options['max_rss_mb'] is not None and rss_mb > options['max_rss_mb']:
+            failures.append(f'RSS {rss_mb:.1f} MiB exceeds {options["max_rss_mb"]:.1f} MiB')
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup budget OK'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.derivatives import build_derivatives
+from api.models import StudyMaterial
+
+
+class Command(BaseCommand):
+    help = 'Build thumbnails and web previews for study materials that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-check materials already marked ready')
+
+    def handle(self, *args, **options):
+        materials = StudyMaterial.objects.exclude(file='').exclude(file__isnull=True)
+        if not options['all']:
+            materials = materials.filter(preview_ready=False, material_type__in=['image', 'pdf'])
+
+        ready = total = 0
+        for material_id in materials.values_list('id', flat=True).iterator():
+            total += 1
+            ready += build_derivatives(material_id)
+        self.stdout.write(self.style.SUCCESS(f'{ready}/{total} materials have previews'))
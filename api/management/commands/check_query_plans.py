@@ -0,0 +1,220 @@
+import json
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.bundles import attempt_token
+from api.mastery import record_observation
+from api.models import (
+    Badge, Chapter, ItemStatistics, MCQOption, ParentProfile, PerformanceAnalytics, ProgressRollup, Question,
+    QuestionAnswer, Quiz, QuizAttempt, QuizQuestion, StudentBadge, StudentProfile, StudentQuizAnswer,
+    StudyMaterial, Subject, TeacherProfile, Topic, UserProfile,
+)
+from api.recommender import refresh_recommendations
+from api.rollups import update_rollups
+
+# Tables that grow with users and history; a full scan of any of them is a regression
+LARGE_TABLES = {
+    model._meta.db_table for model in [
+        User, UserProfile, StudentProfile, TeacherProfile, ParentProfile, Question, QuestionAnswer,
+        QuizQuestion, QuizAttempt, StudentQuizAnswer, PerformanceAnalytics, StudentBadge,
+        ProgressRollup, ItemStatistics,
+    ]
+}
+
+# Django's subquery/join aliases (U0, T3, ...) as SQLite names them in plans
+ALIAS_RE = re.compile(r'(?:FROM|JOIN)\s+"?(\w+)"?\s+(?:AS\s+)?"?([A-Z]\d+)"?')
+
+SMALL, LARGE = 2, 6  # rows per relation in the two seeded worlds; query counts must not differ
+
+
+class Command(BaseCommand):
+    help = (
+        'Call the hot API endpoints against seeded data (rolled back afterwards), print query counts '
+        'and plans, and fail on sequential scans of large tables or query counts that grow with data (N+1).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failures')
+
+    def handle(self, *args, **options):
+        failures = []
+        overrides = override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            AI_PROVIDER='api.ai.OfflineProvider',
+            LLM_THROTTLE_BUCKETS={}, LLM_THROTTLE_GLOBAL={},
+        )
+        with overrides, transaction.atomic():
+            runs = {}
+            for size in (SMALL, LARGE):
+                cache.clear()
+                runs[size] = self._run(self._seed(size))
+            transaction.set_rollback(True)
+        cache.clear()
+
+        for name, (small_count, _) in runs[SMALL].items():
+            large_count, queries = runs[LARGE][name]
+            scans = [scan for sql in queries for scan in self._scans(sql, options['verbose_plans'])]
+            status = 'ok'
+            if large_count != small_count:
+                failures.append(f'{name}: {small_count} queries with {SMALL} rows, {large_count} with {LARGE} (N+1)')
+                status = 'N+1'
+            for table, sql in scans:
+                failures.append(f'{name}: sequential scan of {table}\n    {sql[:300]}')
+                status = 'SCAN'
+            self.stdout.write(f'  {name:<32} {large_count:3d} queries  {status}')
+
+        if failures:
+            raise CommandError('Query plan regressions:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('No sequential scans of large tables, no N+1 queries'))
+
+    # --- seeded world ---
+    def _seed(self, size):
+        tag = f'plans{size}'
+        subject = Subject.objects.create(name=tag, description='')
+        chapters = [Chapter.objects.create(subject=subject, number=i, title=f'{tag} ch{i}', description='')
+                    for i in range(size)]
+        topics = [Topic.objects.create(chapter=chapter, title=f'{tag} topic') for chapter in chapters]
+
+        teacher_user = User.objects.create_user(f'{tag}-teacher')
+        UserProfile.objects.create(user=teacher_user, role='teacher')
+        teacher = TeacherProfile.objects.create(user=teacher_user)
+        student_user = User.objects.create_user(f'{tag}-student')
+        UserProfile.objects.create(user=student_user, role='student')
+        student = StudentProfile.objects.create(user=student_user)
+        parent_user = User.objects.create_user(f'{tag}-parent')
+        UserProfile.objects.create(user=parent_user, role='parent')
+        ParentProfile.objects.create(user=parent_user).children.add(student)
+
+        questions = []
+        for i, topic in enumerate(topics):
+            question = Question.objects.create(topic=topic, question_text=f'{tag} question {i} about photosynthesis',
+                                               question_type='short', difficulty='easy', created_by=teacher)
+            QuestionAnswer.objects.create(question=question, correct_answer='light energy makes sugar',
+                                          explanation='')
+            MCQOption.objects.create(question=question, option_text='light energy', is_correct=True)
+            MCQOption.objects.create(question=question, option_text='soil', is_correct=False)
+            StudyMaterial.objects.create(topic=topic, title=f'{tag} material', material_type='note')
+            questions.append(question)
+        quizzes = []
+        for i, chapter in enumerate(chapters):
+            quiz = Quiz.objects.create(title=f'{tag} quiz {i}', chapter=chapter, time_limit=30, allow_offline=True, created_by=teacher)
+            for order, question in enumerate(questions):
+                QuizQuestion.objects.create(quiz=quiz, question=question, order=order)
+            quizzes.append(quiz)
+
+        attempts = []
+        for quiz in quizzes:
+            attempt = QuizAttempt.objects.create(student=student, quiz=quiz, completed_at=timezone.now(), score=60)
+            for question in questions:
+                # Wrong answers keep every topic weak, so weak-topic and recommendation lists are never empty
+                StudentQuizAnswer.objects.create(attempt=attempt, question=question, student_answer='sugar',
+                                                 ai_score=20, is_correct=False)
+                record_observation(student.pk, question.topic_id, False)
+            attempts.append(attempt)
+        for i, chapter in enumerate(chapters):
+            PerformanceAnalytics.objects.create(student=student, chapter=chapter, accuracy=50)
+            StudentBadge.objects.create(student=student, badge=Badge.objects.create(
+                name=f'{tag} badge {i}', icon='*', description='', requirement=''))
+            ItemStatistics.objects.create(question=questions[i], responses=size)
+        update_rollups([attempt.pk for attempt in attempts])
+        refresh_recommendations([student.pk])
+
+        open_attempt = QuizAttempt.objects.create(student=student, quiz=quizzes[0],
+                                                  expires_at=timezone.now() + timedelta(hours=1))
+        return {
+            'student': student_user, 'teacher': teacher_user, 'parent': parent_user, 'student_id': student.pk,
+            'quiz': quizzes[0], 'attempt': attempts[0], 'open_attempt': open_attempt, 'question': questions[0],
+        }
+
+    def _run(self, world):
+        """{endpoint: (query count, [sql])} for one seeded world."""
+        as_student, as_teacher, as_parent = APIClient(), APIClient(), APIClient()
+        as_student.force_authenticate(world['student'])
+        as_teacher.force_authenticate(world['teacher'])
+        as_parent.force_authenticate(world['parent'])
+        attempt, open_attempt = world['attempt'].pk, world['open_attempt'].pk
+        token = attempt_token(world['open_attempt'], [world['question'].pk])
+        endpoints = [
+            ('subjects', as_student, 'get', '/api/subjects/', None),
+            ('chapters', as_student, 'get', '/api/chapters/', None),
+            ('quiz list', as_student, 'get', '/api/quizzes/', None),
+            ('quiz detail', as_student, 'get', f'/api/quizzes/{world["quiz"].pk}/', None),
+            ('question list', as_teacher, 'get', '/api/questions/', None),
+            ('question detail', as_teacher, 'get', f'/api/questions/{world["question"].pk}/', None),
+            ('student dashboard', as_student, 'get', '/api/student/dashboard/', None),
+            ('student progress', as_student, 'get', '/api/student/progress/?since=2000-01-01', None),
+            ('weak topics', as_student, 'get', '/api/student/weak-topics/', None),
+            ('recommendations', as_student, 'get', '/api/student/recommendations/', None),
+            ('parent progress', as_parent, 'get', f'/api/student/progress/?student={world["student_id"]}', None),
+            ('attempt list', as_student, 'get', '/api/quiz-attempts/', None),
+            ('attempt detail', as_student, 'get', f'/api/quiz-attempts/{attempt}/', None),
+            ('performance', as_student, 'get', '/api/performance/', None),
+            ('my badges', as_student, 'get', '/api/badges/my_badges/', None),
+            ('materials by topic', as_student, 'get', f'/api/materials/?topic={world["question"].topic_id}', None),
+            ('teacher dashboard', as_teacher, 'get', '/api/teacher/dashboard/', None),
+            ('item analysis', as_teacher, 'get', '/api/teacher/item-analysis/', None),
+            ('parent dashboard', as_parent, 'get', '/api/parent/dashboard/', None),
+            ('submit answer', as_student, 'post', f'/api/quiz-attempts/{open_attempt}/submit_answer/',
+             {'question_id': world['question'].pk, 'answer': 'light energy makes sugar'}),
+            ('start quiz offline', as_student, 'post', f'/api/quizzes/{world["quiz"].pk}/start_quiz/',
+             {'offline': True}),
+            ('sync answers', as_student, 'post', f'/api/quiz-attempts/{open_attempt}/sync_answers/',
+             {'token': token, 'answers': [{'question_id': world['question'].pk, 'answer': 'light energy'}]}),
+            ('complete quiz', as_student, 'post', f'/api/quiz-attempts/{open_attempt}/complete_quiz/', {}),
+        ]
+        results = {}
+        for name, client, method, url, data in endpoints:
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                response = getattr(client, method)(url, data, format='json') if data is not None \
+                    else getattr(client, method)(url)
+            if response.status_code >= 400:
+                raise CommandError(f'{name}: {method.upper()} {url} returned {response.status_code}')
+            results[name] = (len(captured.captured_queries), [q['sql'] for q in captured.captured_queries])
+        return results
+
+    # --- plans ---
+    def _scans(self, sql, verbose):
+        """[(table, sql)] for sequential scans of large tables in the plan of one SELECT."""
+        if not sql.lstrip().upper().startswith('SELECT') or ' WHERE ' not in sql:
+            return []  # writes, and unfiltered LIMITed pages, are not checked
+        scans = []
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # With sequential scans priced out, a remaining one means no usable index exists
+                with transaction.atomic():
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                    plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                nodes = [plan[0]['Plan']]
+                while nodes:
+                    node = nodes.pop()
+                    nodes.extend(node.get('Plans', []))
+                    if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in LARGE_TABLES:
+                        scans.append((node['Relation Name'], sql))
+                lines = [json.dumps(plan)]
+            else:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                lines = [row[-1] for row in cursor.fetchall()]
+                aliases = {alias: table for table, alias in ALIAS_RE.findall(sql)}
+                for line in lines:
+                    words = line.split()
+                    # "SCAN <table or alias>" without an index is a full table scan
+                    if words[:1] == ['SCAN'] and len(words) > 1 and 'INDEX' not in words:
+                        table = aliases.get(words[1], words[1])
+                        if table in LARGE_TABLES:
+                            scans.append((table, sql))
+        if verbose:
+            self.stdout.write(sql)
+            for line in lines:
+                self.stdout.write(f'    {line}')
+        return scans
@@ -0,0 +1,101 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.attempts import rescore_attempts
+from api.dedup import (
+    DUPLICATE_THRESHOLD, NUM_PERM, cluster_signatures, index_question, load_signature, mergeable_groups,
+)
+from api.mastery import rebuild_topics
+from api.models import Question, QuestionSignature, QuizAttempt, QuizQuestion, StudentQuizAnswer
+
+
+class Command(BaseCommand):
+    help = 'Find clusters of near-duplicate questions in the bank, optionally merging them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DUPLICATE_THRESHOLD)
+        parser.add_argument('--reindex', action='store_true', help='Recompute every signature first')
+        parser.add_argument('--merge', action='store_true',
+                            help='Repoint quizzes and answers to the oldest question of each mergeable group '
+                                 '(same owner, topic, type, options and correct answer) and delete the rest')
+
+    def handle(self, *args, **options):
+        missing = Question.objects.all()
+        if not options['reindex']:
+            missing = missing.filter(signature__isnull=True)
+        indexed = 0
+        for question_id, text in missing.values_list('id', 'question_text').iterator(chunk_size=2000):
+            index_question(question_id, text)
+            indexed += 1
+        if indexed:
+            self.stdout.write(f'Indexed {indexed} questions')
+
+        ids = []
+        signatures = []
+        for question_id, raw in QuestionSignature.objects.values_list('question_id', 'minhash').iterator(chunk_size=5000):
+            ids.append(question_id)
+            signatures.append(load_signature(raw))
+        if not ids:
+            self.stdout.write('No questions indexed')
+            return
+        matrix = np.vstack(signatures).reshape(len(ids), NUM_PERM)
+
+        clusters = cluster_signatures(ids, matrix, options['threshold'])
+        groups = mergeable_groups(clusters, options['threshold'])
+        similar = sum(len(c) - 1 for c in clusters)
+        duplicates = sum(len(g) - 1 for g in groups)
+        for cluster in clusters:
+            self.stdout.write(f'similar text: {", ".join(map(str, cluster))}')
+        for group in groups:
+            self.stdout.write(f'keep {group[0]}: duplicates {", ".join(map(str, group[1:]))}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(clusters)} clusters, {similar} questions with similar text out of {len(ids)}; '
+            f'{duplicates} are duplicates in {len(groups)} mergeable groups'
+        ))
+
+        if options['merge']:
+            for group in groups:
+                self._merge(group[0], group[1:])
+            self.stdout.write(self.style.SUCCESS(f'Merged {duplicates} questions'))
+
+    @transaction.atomic
+    def _merge(self, keep_id, duplicate_ids):
+        # A quiz listing several copies keeps one row (the canonical one if present), so its size is unchanged
+        rows = QuizQuestion.objects.filter(question_id__in=[keep_id, *duplicate_ids]).order_by('quiz_id', 'order', 'id')
+        kept, drop = {}, []
+        for row_id, quiz_id, question_id in rows.values_list('id', 'quiz_id', 'question_id'):
+            current = kept.get(quiz_id)
+            if current is None:
+                kept[quiz_id] = (row_id, question_id)
+            elif question_id == keep_id and current[1] != keep_id:
+                drop.append(current[0])
+                kept[quiz_id] = (row_id, question_id)
+            else:
+                drop.append(row_id)
+        shrunk = set(QuizQuestion.objects.filter(id__in=drop).values_list('quiz_id', flat=True))
+        QuizQuestion.objects.filter(id__in=drop).delete()
+        QuizQuestion.objects.filter(id__in=[row_id for row_id, _ in kept.values()]).update(question_id=keep_id)
+        # An attempt that answered several copies keeps one answer, preferring the canonical one
+        taken = set(StudentQuizAnswer.objects.filter(question_id=keep_id).values_list('attempt_id', flat=True))
+        move = []
+        duplicates = StudentQuizAnswer.objects.filter(question_id__in=duplicate_ids).order_by('id')
+        for answer_id, attempt_id in duplicates.values_list('id', 'attempt_id'):
+            if attempt_id not in taken:
+                taken.add(attempt_id)
+                move.append(answer_id)
+        StudentQuizAnswer.objects.filter(id__in=move).update(question_id=keep_id, updated_at=timezone.now())
+        dropped = set(
+            StudentQuizAnswer.objects.filter(question_id__in=duplicate_ids)
+            .values_list('attempt_id', 'attempt__student_id')
+        )
+        topic_id = Question.objects.values_list('topic_id', flat=True).get(pk=keep_id)
+        Question.objects.filter(id__in=duplicate_ids).delete()
+
+        # Deleted answers and quiz slots change scores, and deleted answers leave the mastery sequences
+        affected = {attempt_id for attempt_id, _ in dropped}
+        affected.update(QuizAttempt.objects.filter(quiz_id__in=shrunk).values_list('id', flat=True))
+        rescore_attempts(affected)
+        for student_id in {student_id for _, student_id in dropped}:
+            rebuild_topics(student_id, [topic_id])
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.item_analysis import refresh_item_stats
+
+
+class Command(BaseCommand):
+    help = 'Refresh per-question item statistics for questions whose answers or attempts changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every answered question')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = refresh_item_stats(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated item statistics for {written} questions in {time.monotonic() - started:.1f}s'
+        ))
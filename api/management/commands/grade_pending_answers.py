@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from eldas.db_router import primary_only
+
+from api.bundles import grade_pending
+from api.models import StudentQuizAnswer
+
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        'Grade offline-synced answers left waiting for the AI provider, e.g. after a worker restart '
+        'or a failed provider call.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, checking every N seconds (default: once)')
+
+    def handle(self, *args, **options):
+        while True:
+            graded = 0
+            # Younger answers may still be in a web worker's grading queue
+            cutoff = timezone.now() - timedelta(seconds=settings.SYNC_GRADING_RETRY_AFTER)
+            pending = StudentQuizAnswer.objects.filter(
+                ai_score__isnull=True, is_correct__isnull=True, updated_at__lt=cutoff,
+            ).order_by('updated_at')
+            # Read the primary so answers already graded there are not paid for twice
+            with primary_only():
+                while True:
+                    ids = list(pending.values_list('id', flat=True)[:BATCH_SIZE])
+                    if not ids:
+                        break
+                    done = grade_pending(ids)
+                    graded += done
+                    if not done:
+                        break  # the provider is failing; try again next interval
+            if graded or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f'Graded {graded} pending answers'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api.roster import ROSTER_FIELDS, import_roster, read_roster
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-create student accounts from a CSV roster '
+        f"(columns: {', '.join(ROSTER_FIELDS)}). Safe to re-run: existing usernames are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        def report(created, skipped, unlinked, elapsed):
+            rate = created / elapsed if elapsed else 0
+            self.stdout.write(f'{created} created, {skipped} skipped, {unlinked} with unknown parent, {rate:.0f} users/s')
+
+        created, skipped, unlinked = import_roster(
+            read_roster(options['csv_path']),
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            on_chunk=report,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Roster import finished: {created} created, {skipped} skipped'))
+        if unlinked:
+            self.stdout.write(self.style.WARNING(
+                f'{unlinked} students were created without their parent link: the parent username does not exist'
+            ))
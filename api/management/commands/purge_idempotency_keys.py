@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys and abandoned in-flight markers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, purging every N seconds (default: purge once and exit)')
+
+    def handle(self, *args, **options):
+        while True:
+            now = timezone.now()
+            done, _ = IdempotencyKey.objects.filter(
+                state=IdempotencyKey.DONE,
+                created_at__lt=now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            ).delete()
+            stale, _ = IdempotencyKey.objects.filter(
+                state=IdempotencyKey.PENDING,
+                created_at__lt=now - timedelta(seconds=settings.IDEMPOTENCY_STALE_AFTER),
+            ).delete()
+            if done or stale or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f'Purged {done} expired and {stale} abandoned keys'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.recommender import rankings_digest, refresh_recommendations, stale_students, topic_rankings
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute study material recommendations for students whose topic mastery changed. '
+        'With --interval, every student is refreshed whenever materials are added, removed or re-rated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Refresh every student')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, refreshing every N seconds (default: once)')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        seen = None
+        while True:
+            started = time.monotonic()
+            rankings = topic_rankings()
+            digest = rankings_digest(rankings)
+            # Material changes move every student's ranking, not only those whose mastery changed
+            if seen is not None and digest != seen:
+                full = True
+            seen = digest
+            students = stale_students(full=full)
+            written = refresh_recommendations(students, rankings) if students else 0
+            if written or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Refreshed recommendations for {written} students{" (full)" if full else ""} '
+                    f'in {time.monotonic() - started:.2f}s'
+                ))
+            if not options['interval']:
+                return
+            full = False
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.mastery import replay
+from api.models import StudentProfile
+
+
+class Command(BaseCommand):
+    help = 'Rebuild topic mastery (knowledge tracing) states from answer history, a chunk of students at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Students per replay')
+        parser.add_argument('--start-after', type=int, default=0,
+                            help='Resume after this student id (printed as each chunk commits)')
+
+    def handle(self, *args, **options):
+        last_id = options['start_after']
+        states = answers = 0
+        while True:
+            ids = list(
+                StudentProfile.objects.filter(pk__gt=last_id)
+                .order_by('pk').values_list('pk', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            chunk_states, chunk_answers = replay(ids)
+            states += chunk_states
+            answers += chunk_answers
+            last_id = ids[-1]
+            self.stdout.write(f'  up to student {last_id}: {answers} answers replayed')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {states} mastery states from {answers} answers'))
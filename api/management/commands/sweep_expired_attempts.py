@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from eldas.db_router import primary_only
+
+from api.attempts import sweep_expired_attempts
+
+
+class Command(BaseCommand):
+    help = 'Complete and score quiz attempts whose time limit has run out.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, sweeping every N seconds (default: sweep once and exit)')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            # A lagging replica would keep handing back attempts already closed on the primary
+            with primary_only():
+                completed = sweep_expired_attempts(batch_size=options['batch_size'])
+            if completed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f'Completed {completed} expired attempts'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
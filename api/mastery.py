@@ -0,0 +1,153 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from eldas.db_router import primary_only
+
+from .models import StudentQuizAnswer, TopicMastery
+
+TOPIC_DTYPE = np.dtype('<i4')
+P_DTYPE = np.dtype('<f4')
+
+
+def bkt_update(p_known, correct, params):
+    """
+    One Bayesian Knowledge Tracing step: condition P(known) on the observed
+    answer, then apply the learning transition. Works on scalars and arrays.
+    """
+    slip, guess = params['p_slip'], params['p_guess']
+    known = np.where(correct, p_known * (1 - slip), p_known * slip)
+    unknown = np.where(correct, (1 - p_known) * guess, (1 - p_known) * (1 - guess))
+    posterior = known / (known + unknown)
+    return posterior + (1 - posterior) * params['p_learn']
+
+
+def unpack(mastery):
+    """(topic ids, P(known)) as writable arrays."""
+    topics = np.frombuffer(bytes(mastery.topic_ids), dtype=TOPIC_DTYPE).copy()
+    p_known = np.frombuffer(bytes(mastery.p_known), dtype=P_DTYPE).copy()
+    return topics, p_known
+
+
+def pack(topics, p_known):
+    return topics.astype(TOPIC_DTYPE).tobytes(), p_known.astype(P_DTYPE).tobytes()
+
+
+def answer_correct(is_correct, ai_score):
+    # Graders always set is_correct; the score is a fallback for old rows without it
+    if is_correct is not None:
+        return bool(is_correct)
+    return (ai_score or 0) >= 50
+
+
+def graded(answers):
+    """Answers that carry a grade; rows still waiting for one are not observations yet."""
+    return answers.filter(Q(is_correct__isnull=False) | Q(ai_score__isnull=False))
+
+
+def record_observation(student_id, topic_id, correct):
+    """
+    Fold one newly graded answer into the student's state: a binary search and
+    one row write. Only exact for an answer that is the student's newest
+    graded one on the topic; when an existing answer changes, use rebuild_topics.
+    """
+    params = settings.BKT_PARAMS
+    with primary_only(), transaction.atomic():
+        mastery, _ = TopicMastery.objects.select_for_update().get_or_create(student_id=student_id)
+        topics, p_known = unpack(mastery)
+        i = np.searchsorted(topics, topic_id)
+        if i == len(topics) or topics[i] != topic_id:
+            topics = np.insert(topics, i, topic_id)
+            p_known = np.insert(p_known, i, params['p_init'])
+        p_known[i] = bkt_update(p_known[i], correct, params)
+        mastery.topic_ids, mastery.p_known = pack(topics, p_known)
+        mastery.save()
+
+
+def rebuild_topics(student_id, topic_ids):
+    """
+    Recompute the student's state on ``topic_ids`` from their stored graded
+    answers, in answer order, as replay would. Used when an answer that was
+    already observed is changed or re-graded, so it is not counted twice.
+    """
+    params = settings.BKT_PARAMS
+    topic_ids = sorted(set(topic_ids))
+    if not topic_ids:
+        return
+    with primary_only(), transaction.atomic():
+        mastery, _ = TopicMastery.objects.select_for_update().get_or_create(student_id=student_id)
+        rows = graded(StudentQuizAnswer.objects.filter(
+            attempt__student_id=student_id, question__topic_id__in=topic_ids,
+        )).order_by('id').values_list('question__topic_id', 'is_correct', 'ai_score')
+        rebuilt = {}
+        for topic_id, is_correct, ai_score in rows:
+            p = rebuilt.get(topic_id, P_DTYPE.type(params['p_init']))
+            rebuilt[topic_id] = P_DTYPE.type(bkt_update(p, answer_correct(is_correct, ai_score), params))
+
+        topics, p_known = unpack(mastery)
+        keep = ~np.isin(topics, topic_ids)
+        topics = np.concatenate([topics[keep], np.array(list(rebuilt), dtype=TOPIC_DTYPE)])
+        p_known = np.concatenate([p_known[keep], np.array(list(rebuilt.values()), dtype=P_DTYPE)])
+        order = np.argsort(topics, kind='stable')
+        mastery.topic_ids, mastery.p_known = pack(topics[order], p_known[order])
+        mastery.save()
+
+
+def replay(student_ids):
+    """
+    Rebuild the states of the given students from their stored answers.
+
+    Every (student, topic) sequence is advanced together: step k updates the
+    k-th answer of all sequences in one array operation, so the Python loop
+    runs once per answer of the longest sequence, not once per answer.
+    """
+    params = settings.BKT_PARAMS
+    with primary_only():
+        rows = list(
+            graded(StudentQuizAnswer.objects.filter(attempt__student_id__in=student_ids))
+            .order_by('id')
+            .values_list('attempt__student_id', 'question__topic_id', 'is_correct', 'ai_score')
+        )
+    states = []
+    if rows:
+        student = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        topic = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        correct = np.fromiter((answer_correct(r[2], r[3]) for r in rows), dtype=bool, count=len(rows))
+
+        keys, seq = np.unique((student << 32) | topic, return_inverse=True)
+        # Position of each answer within its own (student, topic) sequence, in answer order
+        by_seq = np.argsort(seq, kind='stable')
+        starts = np.searchsorted(seq[by_seq], np.arange(len(keys)))
+        position = np.empty(len(seq), dtype=np.int64)
+        position[by_seq] = np.arange(len(seq)) - starts[seq[by_seq]]
+
+        by_step = np.argsort(position, kind='stable')
+        bounds = np.searchsorted(position[by_step], np.arange(position.max() + 2))
+        p_known = np.full(len(keys), params['p_init'], dtype=P_DTYPE)
+        for step in range(position.max() + 1):
+            answers = by_step[bounds[step]:bounds[step + 1]]
+            p_known[seq[answers]] = bkt_update(p_known[seq[answers]], correct[answers], params)
+
+        owners = keys >> 32
+        student_ids_found, first = np.unique(owners, return_index=True)
+        for j, owner in enumerate(student_ids_found):
+            end = first[j + 1] if j + 1 < len(first) else len(keys)
+            topic_ids, packed_p = pack(keys[first[j]:end] & 0xFFFFFFFF, p_known[first[j]:end])
+            states.append(TopicMastery(student_id=int(owner), topic_ids=topic_ids, p_known=packed_p))
+
+    with transaction.atomic():
+        TopicMastery.objects.filter(student_id__in=student_ids).delete()
+        TopicMastery.objects.bulk_create(states)
+    return len(states), len(rows)
+
+
+def weak_topics(student, limit=5):
+    """[(topic id, P(known))] below settings.BKT_MASTERED, weakest first."""
+    mastery = TopicMastery.objects.filter(student=student).first()
+    if mastery is None:
+        return []
+    topics, p_known = unpack(mastery)
+    weak = np.flatnonzero(p_known < settings.BKT_MASTERED)
+    weak = weak[np.argsort(p_known[weak], kind='stable')[:limit]]
+    return [(int(topics[i]), float(p_known[i])) for i in weak]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-19 01:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def remove_duplicate_answers(apps, schema_editor):
+    # Retried submissions left several rows per (attempt, question); keep the latest one.
+    StudentQuizAnswer = apps.get_model('api', 'StudentQuizAnswer')
+    db_alias = schema_editor.connection.alias
+    latest = (
+        StudentQuizAnswer.objects.using(db_alias).values('attempt_id', 'question_id')
+        .annotate(keep_id=models.Max('id'), n=models.Count('id'))
+        .filter(n__gt=1)
+    )
+    for row in latest.iterator():
+        StudentQuizAnswer.objects.using(db_alias).filter(
+            attempt_id=row['attempt_id'], question_id=row['question_id'], id__lt=row['keep_id']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_answers, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='studentquizanswer',
+            unique_together={('attempt', 'question')},
+        ),
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done')], default='pending', max_length=10)),
+                ('response_status', models.IntegerField(blank=True, null=True)),
+                ('response_body', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
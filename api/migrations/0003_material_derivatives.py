@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_idempotent_answers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studymaterial',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='studymaterial',
+            name='preview_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 01:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_material_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='api.question')),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='api.question')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 01:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_question_dedup_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemStatistics',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='item_stats', serialize=False, to='api.question')),
+                ('responses', models.IntegerField(default=0)),
+                ('p_value', models.FloatField(blank=True, null=True)),
+                ('discrimination', models.FloatField(blank=True, null=True)),
+                ('avg_ai_score', models.FloatField(blank=True, null=True)),
+                ('distractors', models.JSONField(blank=True, default=dict)),
+                ('last_answer_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
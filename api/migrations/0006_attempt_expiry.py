@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-19 01:38
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_open_attempts(apps, schema_editor):
+    # Only open attempts matter to the sweeper; completed ones keep expires_at empty.
+    QuizAttempt = apps.get_model('api', 'QuizAttempt')
+    db_alias = schema_editor.connection.alias
+    open_attempts = (
+        QuizAttempt.objects.using(db_alias).filter(completed_at__isnull=True)
+        .values_list('id', 'started_at', 'quiz__time_limit')
+    )
+    batch = []
+    for pk, started_at, time_limit in open_attempts.iterator(chunk_size=2000):
+        batch.append(QuizAttempt(id=pk, expires_at=started_at + timedelta(minutes=time_limit)))
+        if len(batch) == 2000:
+            QuizAttempt.objects.using(db_alias).bulk_update(batch, ['expires_at'])
+            batch = []
+    QuizAttempt.objects.using(db_alias).bulk_update(batch, ['expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_item_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_open_attempts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['expires_at'], name='open_attempt_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-19 01:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_attempt_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('attempts', models.IntegerField(default=0)),
+                ('passed', models.IntegerField(default=0)),
+                ('total_score', models.FloatField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_rollups', to='api.studentprofile')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.subject')),
+            ],
+            options={
+                'unique_together': {('student', 'period', 'period_start', 'subject')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 01:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_progress_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicMastery',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='mastery', serialize=False, to='api.studentprofile')),
+                ('topic_ids', models.BinaryField(default=bytes)),
+                ('p_known', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 01:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_topic_mastery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialRecommendation',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendations', serialize=False, to='api.studentprofile')),
+                ('material_ids', models.BinaryField(default=bytes)),
+                ('scores', models.BinaryField(default=bytes)),
+                ('mastery_updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-19 01:48
+
+from django.db import migrations, models
+
+
+def remove_duplicate_analytics(apps, schema_editor):
+    # Several rows per (student, chapter) could be created through the API; keep the latest one.
+    PerformanceAnalytics = apps.get_model('api', 'PerformanceAnalytics')
+    db_alias = schema_editor.connection.alias
+    latest = (
+        PerformanceAnalytics.objects.using(db_alias).values('student_id', 'chapter_id')
+        .annotate(keep_id=models.Max('id'), n=models.Count('id'))
+        .filter(n__gt=1)
+    )
+    for row in latest.iterator():
+        PerformanceAnalytics.objects.using(db_alias).filter(
+            student_id=row['student_id'], chapter_id=row['chapter_id'], id__lt=row['keep_id']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_material_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_analytics, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='performanceanalytics',
+            unique_together={('student', 'chapter')},
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['topic', 'difficulty', 'question_type'], name='question_topic_filter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', 'quiz', 'completed_at'], name='attempt_student_quiz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', '-started_at'], name='attempt_student_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizquestion',
+            index=models.Index(fields=['quiz', 'order'], name='quizquestion_quiz_order_idx'),
+        ),
+    ]
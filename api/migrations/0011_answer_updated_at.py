@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='itemstatistics',
+            name='last_answer_id',
+        ),
+        migrations.AddField(
+            model_name='itemstatistics',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentquizanswer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
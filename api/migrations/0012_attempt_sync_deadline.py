@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-19 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_answer_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='quizattempt',
+            name='open_attempt_expiry_idx',
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='sync_deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True), ('sync_deadline__isnull', True)), fields=['expires_at'], name='open_attempt_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True), ('sync_deadline__isnull', False)), fields=['sync_deadline'], name='open_attempt_sync_idx'),
+        ),
+    ]
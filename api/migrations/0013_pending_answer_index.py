@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_attempt_sync_deadline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentquizanswer',
+            index=models.Index(condition=models.Q(('ai_score__isnull', True), ('is_correct__isnull', True)), fields=['updated_at'], name='pending_answer_idx'),
+        ),
+    ]
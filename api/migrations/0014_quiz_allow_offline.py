@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_pending_answer_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='allow_offline',
+            field=models.BooleanField(default=False, help_text='Students may download it and sync answers later'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_quiz_allow_offline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemStatisticsRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('questions', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['completed_at'], name='attempt_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentquizanswer',
+            index=models.Index(fields=['updated_at'], name='answer_updated_idx'),
+        ),
+    ]
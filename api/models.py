@@ -1,4 +1,8 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -13,6 +17,12 @@ class UserProfile(models.Model):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The role is part of the cached student dashboard
+        from .dashboard import invalidate_dashboards
+        invalidate_dashboards(StudentProfile.objects.filter(user_id=self.user_id).values_list('pk', flat=True))
+    
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
@@ -25,6 +35,11 @@ class StudentProfile(models.Model):
     current_tier = models.CharField(max_length=20, default='Bronze')
     current_streak = models.IntegerField(default=0)
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .dashboard import invalidate_dashboards
+        invalidate_dashboards([self.pk])
+    
     def __str__(self):
         return f"Student: {self.user.username}"
 
@@ -89,6 +104,15 @@ class Question(models.Model):
     created_by = models.ForeignKey(TeacherProfile, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [models.Index(fields=['topic', 'difficulty', 'question_type'], name='question_topic_filter_idx')]
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Keep the near-duplicate index in step with the question text
+        from .dedup import index_question
+        transaction.on_commit(lambda pk=self.pk, text=self.question_text: index_question(pk, text))
+    
     def __str__(self):
         return self.question_text[:100]
 
@@ -118,6 +142,7 @@ class Quiz(models.Model):
     description = models.TextField(blank=True)
     chapter = models.ForeignKey(Chapter, on_delete=models.CASCADE, related_name='quizzes')
     time_limit = models.IntegerField(help_text="Minutes")
+    allow_offline = models.BooleanField(default=False, help_text="Students may download it and sync answers later")
     passing_percentage = models.IntegerField(default=50)
     created_by = models.ForeignKey(TeacherProfile, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -133,6 +158,7 @@ class QuizQuestion(models.Model):
     
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['quiz', 'order'], name='quizquestion_quiz_order_idx')]
     
     def __str__(self):
         return f"{self.quiz.title} - Q{self.order}"
@@ -143,8 +169,41 @@ class QuizAttempt(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)  # started_at + quiz.time_limit
+    sync_deadline = models.DateTimeField(null=True, blank=True)  # offline bundles: last moment the upload is accepted
     score = models.FloatField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # The sweeper's range scans only ever look at open attempts
+            models.Index(fields=['expires_at'], condition=models.Q(completed_at__isnull=True, sync_deadline__isnull=True),
+                         name='open_attempt_expiry_idx'),
+            models.Index(fields=['sync_deadline'], condition=models.Q(completed_at__isnull=True, sync_deadline__isnull=False),
+                         name='open_attempt_sync_idx'),
+            models.Index(fields=['student', 'quiz', 'completed_at'], name='attempt_student_quiz_idx'),
+            models.Index(fields=['student', '-started_at'], name='attempt_student_recent_idx'),
+            # Attempts completed since the last item statistics run
+            models.Index(fields=['completed_at'], name='attempt_completed_idx'),
+        ]
+    
+    def accepts_answers(self, now=None):
+        """Not completed and still inside the time limit (plus QUIZ_SUBMIT_GRACE_SECONDS)."""
+        if self.completed_at is not None:
+            return False
+        if self.expires_at is None:
+            return True
+        now = now or timezone.now()
+        return now <= self.expires_at + timedelta(seconds=settings.QUIZ_SUBMIT_GRACE_SECONDS)
+    
+    def accepts_sync(self, now=None):
+        """Whether an offline bundle upload is still accepted: not completed and before sync_deadline."""
+        if self.sync_deadline is None:
+            return self.accepts_answers(now)
+        if self.completed_at is not None:
+            return False
+        now = now or timezone.now()
+        return now <= self.sync_deadline + timedelta(seconds=settings.QUIZ_SUBMIT_GRACE_SECONDS)
+    
     def __str__(self):
         return f"{self.student.user.username} - {self.quiz.title}"
 
@@ -156,6 +215,17 @@ class StudentQuizAnswer(models.Model):
     ai_score = models.FloatField(null=True, blank=True)
     ai_feedback = models.TextField(blank=True)
     is_correct = models.BooleanField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # set explicitly by queryset.update() / bulk_update() callers
+    
+    class Meta:
+        unique_together = ('attempt', 'question')
+        indexes = [
+            # Offline-synced answers waiting for the AI provider (see grade_pending_answers)
+            models.Index(fields=['updated_at'], condition=models.Q(ai_score__isnull=True, is_correct__isnull=True),
+                         name='pending_answer_idx'),
+            # Answers changed since the last item statistics run
+            models.Index(fields=['updated_at'], name='answer_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Answer - {self.attempt.student.user.username}"
@@ -171,6 +241,26 @@ class StudyMaterial(models.Model):
     file = models.FileField(upload_to='materials/', null=True, blank=True)
     url = models.URLField(blank=True)
     rating = models.FloatField(default=5.0, validators=[MinValueValidator(0), MaxValueValidator(5)])
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # sha256 of file, keys derivatives
+    preview_ready = models.BooleanField(default=False)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'file' in field_names:
+            instance._loaded_file_name = values[field_names.index('file')]
+        return instance
+    
+    def save(self, *args, **kwargs):
+        file_changed = (self.file.name or None) != (getattr(self, '_loaded_file_name', None) or None)
+        if file_changed:
+            self.content_hash = ''
+            self.preview_ready = False
+        super().save(*args, **kwargs)
+        self._loaded_file_name = self.file.name
+        if file_changed and self.file:
+            from .derivatives import schedule_derivatives
+            schedule_derivatives(self.pk)
     
     def __str__(self):
         return f"{self.title} - {self.material_type}"
@@ -189,6 +279,9 @@ class PerformanceAnalytics(models.Model):
     accuracy = models.FloatField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        unique_together = ('student', 'chapter')
+    
     def __str__(self):
         return f"{self.student.user.username} - {self.chapter.title}"
 
@@ -211,5 +304,120 @@ class StudentBadge(models.Model):
     class Meta:
         unique_together = ('student', 'badge')
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .dashboard import invalidate_dashboards
+        invalidate_dashboards([self.student_id])
+    
+    def delete(self, *args, **kwargs):
+        from .dashboard import invalidate_dashboards
+        invalidate_dashboards([self.student_id])
+        return super().delete(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.student.user.username} - {self.badge.name}"
+
+# ===== QUESTION SIGNATURE =====
+class QuestionSignature(models.Model):
+    """MinHash signature of a question's text, used for near-duplicate detection."""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()  # packed uint32 array, see api.dedup.NUM_PERM
+    
+    def __str__(self):
+        return f"Signature: {self.question_id}"
+
+# ===== QUESTION LSH BUCKET =====
+class QuestionLSHBucket(models.Model):
+    """One row per (question, LSH band); questions sharing a bucket are duplicate candidates."""
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='lsh_buckets')
+    bucket = models.BigIntegerField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.question_id} - {self.bucket}"
+
+# ===== ITEM STATISTICS =====
+class ItemStatistics(models.Model):
+    """Classical item analysis for a question, refreshed by the compute_item_stats command."""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='item_stats')
+    responses = models.IntegerField(default=0)
+    p_value = models.FloatField(null=True, blank=True)  # share of graded answers that were correct
+    discrimination = models.FloatField(null=True, blank=True)  # point-biserial against attempt score
+    avg_ai_score = models.FloatField(null=True, blank=True)
+    distractors = models.JSONField(default=dict, blank=True)  # {option_id: times chosen}
+    computed_at = models.DateTimeField(null=True, blank=True)  # answers and completions after this are not included
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Stats: {self.question_id}"
+
+class ItemStatisticsRun(models.Model):
+    """The last finished item statistics refresh; the next one only looks at changes after started_at."""
+    started_at = models.DateTimeField()
+    questions = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"Item statistics run at {self.started_at}"
+
+# ===== PROGRESS ROLLUP =====
+class ProgressRollup(models.Model):
+    """Completed attempts per student, subject and day or week; what progress charts read."""
+    PERIODS = [('day', 'Day'), ('week', 'Week')]
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='progress_rollups')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    period = models.CharField(max_length=4, choices=PERIODS)
+    period_start = models.DateField()  # the day, or the Monday of the week
+    attempts = models.IntegerField(default=0)
+    passed = models.IntegerField(default=0)
+    total_score = models.FloatField(default=0)
+    best_score = models.FloatField(default=0)
+    
+    class Meta:
+        unique_together = ('student', 'period', 'period_start', 'subject')
+    
+    def __str__(self):
+        return f"{self.student.user.username} - {self.subject.name} - {self.period} {self.period_start}"
+
+# ===== TOPIC MASTERY =====
+class TopicMastery(models.Model):
+    """
+    Knowledge-tracing state for one student: sorted topic ids (int32) and the
+    probability each is mastered (float32), packed side by side. See api.mastery.
+    """
+    student = models.OneToOneField(StudentProfile, on_delete=models.CASCADE, primary_key=True, related_name='mastery')
+    topic_ids = models.BinaryField(default=bytes)
+    p_known = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Mastery: {self.student_id}"
+
+# ===== MATERIAL RECOMMENDATION =====
+class MaterialRecommendation(models.Model):
+    """A student's top study materials (packed int32 ids, float32 scores), best first. See api.recommender."""
+    student = models.OneToOneField(StudentProfile, on_delete=models.CASCADE, primary_key=True, related_name='recommendations')
+    material_ids = models.BinaryField(default=bytes)
+    scores = models.BinaryField(default=bytes)
+    mastery_updated_at = models.DateTimeField(null=True, blank=True)  # TopicMastery.updated_at these were built from
+    
+    def __str__(self):
+        return f"Recommendations: {self.student_id}"
+
+# ===== IDEMPOTENCY KEY =====
+class IdempotencyKey(models.Model):
+    """In-flight / completed marker for a request that must not run twice."""
+    PENDING = 'pending'
+    DONE = 'done'
+    STATES = [(PENDING, 'Pending'), (DONE, 'Done')]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    state = models.CharField(max_length=10, choices=STATES, default=PENDING)
+    response_status = models.IntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        unique_together = ('user', 'key')
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.key} ({self.state})"
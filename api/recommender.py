@@ -0,0 +1,151 @@
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from eldas.db_router import primary_only
+
+from .mastery import unpack
+from .models import MaterialRecommendation, StudyMaterial, TopicMastery
+
+STUDENT_CHUNK = 1000
+
+
+def recommendation_key(student_id):
+    return f'recommendations:student:{student_id}'
+
+
+def topic_rankings():
+    """
+    Best materials per topic as CSR arrays (topic ids, row offsets, material
+    ids, quality), quality being rating / 5 weighted by MATERIAL_TYPE_WEIGHTS.
+    """
+    rows = list(StudyMaterial.objects.values_list('id', 'topic_id', 'material_type', 'rating'))
+    weights = settings.MATERIAL_TYPE_WEIGHTS
+    material = np.array([r[0] for r in rows], dtype=np.int64)
+    topic = np.array([r[1] for r in rows], dtype=np.int64)
+    quality = np.array([r[3] / 5 * weights.get(r[2], 0.5) for r in rows], dtype=np.float64)
+
+    order = np.lexsort((material, -quality, topic))
+    material, topic, quality = material[order], topic[order], quality[order]
+    topics, starts, counts = np.unique(topic, return_index=True, return_counts=True)
+    # Keep the first RECOMMENDATION_MATERIALS_PER_TOPIC of each topic's run
+    rank = np.arange(len(topic)) - np.repeat(starts, counts)
+    keep = rank < settings.RECOMMENDATION_MATERIALS_PER_TOPIC
+    counts = np.minimum(counts, settings.RECOMMENDATION_MATERIALS_PER_TOPIC)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return topics, offsets, material[keep], quality[keep]
+
+
+def rankings_digest(rankings):
+    """Fingerprint of topic_rankings(); changes when materials are added, removed, re-rated or re-typed."""
+    digest = hashlib.sha1()
+    for array in rankings:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def weakness_matrix(masteries):
+    """Sparse student x topic weakness (1 - P(known)) as CSR arrays; mastered topics are left out."""
+    indptr, topics, weakness = [0], [], []
+    for mastery in masteries:
+        topic_ids, p_known = unpack(mastery)
+        weak = p_known < settings.BKT_MASTERED
+        topics.append(topic_ids[weak].astype(np.int64))
+        weakness.append(1 - p_known[weak].astype(np.float64))
+        indptr.append(indptr[-1] + int(weak.sum()))
+    if not topics:
+        return np.array(indptr), np.array([], dtype=np.int64), np.array([])
+    return np.array(indptr), np.concatenate(topics), np.concatenate(weakness)
+
+
+def top_materials(matrix, rankings, n):
+    """
+    Top ``n`` (material ids, scores) per matrix row, score = weakness x quality.
+    Every (weak topic, ranked material) pair of every row is expanded and
+    ranked at once.
+    """
+    indptr, topics, weakness = matrix
+    rank_topics, offsets, rank_materials, quality = rankings
+    n_rows = len(indptr) - 1
+    row = np.repeat(np.arange(n_rows), np.diff(indptr))
+
+    if len(rank_topics):
+        found = np.minimum(np.searchsorted(rank_topics, topics), len(rank_topics) - 1)
+        ranked = rank_topics[found] == topics
+    else:
+        found = np.zeros(len(topics), dtype=np.int64)
+        ranked = np.zeros(len(topics), dtype=bool)
+    row, weakness, found = row[ranked], weakness[ranked], found[ranked]
+
+    # One candidate per (weak topic, ranked material of that topic)
+    counts = offsets[found + 1] - offsets[found]
+    entry = np.repeat(np.arange(len(found)), counts)
+    candidate = offsets[found][entry] + np.arange(len(entry)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cand_row = row[entry]
+    cand_score = weakness[entry] * quality[candidate]
+    cand_material = rank_materials[candidate]
+
+    order = np.lexsort((cand_material, -cand_score, cand_row))
+    cand_row, cand_score, cand_material = cand_row[order], cand_score[order], cand_material[order]
+    row_start = np.searchsorted(cand_row, np.arange(n_rows + 1))
+    return [
+        (cand_material[row_start[i]:min(row_start[i + 1], row_start[i] + n)],
+         cand_score[row_start[i]:min(row_start[i + 1], row_start[i] + n)])
+        for i in range(n_rows)
+    ]
+
+
+def stale_students(full=False):
+    """Students whose mastery changed since their recommendations were built."""
+    masteries = TopicMastery.objects.all()
+    if not full:
+        masteries = masteries.filter(
+            Q(student__recommendations__isnull=True)
+            | Q(updated_at__gt=F('student__recommendations__mastery_updated_at'))
+        )
+    return list(masteries.order_by('student_id').values_list('student_id', flat=True))
+
+
+def refresh_recommendations(student_ids, rankings=None):
+    """Recompute and store the top materials of the given students; returns how many were written."""
+    n = settings.RECOMMENDATIONS_PER_STUDENT
+    written = 0
+    with primary_only():
+        rankings = rankings or topic_rankings()
+        for i in range(0, len(student_ids), STUDENT_CHUNK):
+            masteries = list(TopicMastery.objects.filter(student_id__in=student_ids[i:i + STUDENT_CHUNK]))
+            results = top_materials(weakness_matrix(masteries), rankings, n)
+            rows, cached = [], {}
+            for mastery, (materials, scores) in zip(masteries, results):
+                rows.append(MaterialRecommendation(
+                    student_id=mastery.student_id,
+                    material_ids=materials.astype('<i4').tobytes(),
+                    scores=scores.astype('<f4').tobytes(),
+                    mastery_updated_at=mastery.updated_at,
+                ))
+                cached[recommendation_key(mastery.student_id)] = list(zip(materials.tolist(), scores.tolist()))
+            MaterialRecommendation.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['student'],
+                update_fields=['material_ids', 'scores', 'mastery_updated_at'],
+            )
+            cache.set_many(cached, settings.RECOMMENDATION_CACHE_TTL)
+            written += len(rows)
+    return written
+
+
+def get_recommendations(student_id):
+    """[(material id, score)] best first, from the cache or the stored row."""
+    key = recommendation_key(student_id)
+    recommendations = cache.get(key)
+    if recommendations is None:
+        row = MaterialRecommendation.objects.filter(student_id=student_id).first()
+        if row is None:
+            return []
+        materials = np.frombuffer(bytes(row.material_ids), dtype='<i4')
+        scores = np.frombuffer(bytes(row.scores), dtype='<f4')
+        recommendations = list(zip(materials.tolist(), scores.tolist()))
+        cache.set(key, recommendations, settings.RECOMMENDATION_CACHE_TTL)
+    return recommendations
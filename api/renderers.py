@@ -0,0 +1,47 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_drf_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes through orjson.
+
+    Datetimes and anything orjson does not know natively go through DRF's own
+    encoder, and U+2028/U+2029 are escaped as DRF does. Indented (browsable or
+    ``; indent=``) responses use DRF's renderer. Floats written in exponent
+    form (|x| >= 1e16 or < 1e-4) are spelled differently but parse identically.
+    """
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_drf_default, option=self.OPTIONS)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def _msgpack_default(obj):
+    # Same conversions as JSON so both formats carry identical values
+    value = _drf_default(obj)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return value
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack responses for clients sending ``Accept: application/msgpack``."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
@@ -0,0 +1,86 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Max, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from eldas.db_router import primary_only
+
+from .models import ProgressRollup, QuizAttempt
+
+PASSED = Q(score__gte=F('quiz__passing_percentage'))
+ROLLUP_FIELDS = ['attempts', 'passed', 'total_score', 'best_score']
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def bucket_rows(attempts):
+    """Day and week ProgressRollup rows for a queryset of completed attempts, aggregated in SQL."""
+    rows = []
+    for period in ('day', 'week'):
+        grouped = (
+            attempts.order_by()
+            .annotate(period_start=Trunc('completed_at', period, output_field=DateField()))
+            .values('student_id', 'period_start', subject_id=F('quiz__chapter__subject'))
+            .annotate(
+                attempts=Count('pk'),
+                passed=Count('pk', filter=PASSED),
+                total_score=Sum('score'),
+                best_score=Max('score'),
+            )
+        )
+        rows.extend(ProgressRollup(period=period, **row) for row in grouped)
+    return rows
+
+
+def save_rows(rows):
+    ProgressRollup.objects.bulk_create(
+        rows, update_conflicts=True,
+        unique_fields=['student', 'period', 'period_start', 'subject'],
+        update_fields=ROLLUP_FIELDS,
+    )
+
+
+def update_rollups(attempt_ids):
+    """
+    Recompute the buckets touched by newly completed attempts.
+
+    Whole weeks are re-aggregated from the attempts table (a few rows per
+    student), so the result is the same however often or concurrently it runs.
+    """
+    with primary_only():
+        touched = list(
+            QuizAttempt.objects.filter(pk__in=attempt_ids, completed_at__isnull=False)
+            .values_list('student_id', 'quiz__chapter__subject_id', 'completed_at')
+        )
+        if not touched:
+            return
+        weeks = {
+            (student_id, subject_id, week_start(timezone.localtime(completed_at).date()))
+            for student_id, subject_id, completed_at in touched
+        }
+        first = min(week for _, _, week in weeks)
+        last = max(week for _, _, week in weeks) + timedelta(days=7)
+        attempts = QuizAttempt.objects.filter(
+            completed_at__isnull=False,
+            student_id__in={student_id for student_id, _, _ in weeks},
+            quiz__chapter__subject_id__in={subject_id for _, subject_id, _ in weeks},
+            completed_at__gte=timezone.make_aware(datetime.combine(first, time.min)),
+            completed_at__lt=timezone.make_aware(datetime.combine(last, time.min)),
+        )
+        save_rows([
+            row for row in bucket_rows(attempts)
+            if (row.student_id, row.subject_id, week_start(row.period_start)) in weeks
+        ])
+
+
+def rebuild_rollups(student_ids):
+    """Replace every bucket of the given students from their full attempt history."""
+    with primary_only(), transaction.atomic():
+        ProgressRollup.objects.filter(student_id__in=student_ids).delete()
+        rows = bucket_rows(QuizAttempt.objects.filter(student_id__in=student_ids, completed_at__isnull=False))
+        save_rows(rows)
+    return len(rows)
@@ -0,0 +1,137 @@
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from eldas.db_router import primary_only
+
+from .models import UserProfile, StudentProfile, ParentProfile
+
+ROSTER_FIELDS = ['username', 'email', 'password', 'grade', 'learning_style', 'parent']
+
+
+def read_roster(path):
+    """Yield roster rows from a CSV file with a header line (see ROSTER_FIELDS)."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            row = {k.strip(): (v or '').strip() for k, v in row.items() if k}
+            if row.get('username'):
+                yield row
+
+
+def _hash_password(raw):
+    # An empty password gives the user an unusable password, like create_user(password=None)
+    return make_password(raw or None)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_roster(rows, chunk_size=500, workers=None, on_chunk=None):
+    """
+    Create student accounts for ``rows`` in bulk.
+
+    Passwords of the next chunk are hashed in a process pool while the
+    current chunk is being inserted. Each chunk is inserted in its own
+    transaction and usernames that already exist are skipped, so re-running
+    an import after a failure resumes where it stopped. Rows naming a parent
+    that does not exist are imported without the link and counted as
+    unlinked. ``on_chunk(created, skipped, unlinked, elapsed)`` is called
+    after each chunk. Returns ``(created, skipped, unlinked)``.
+    """
+    created = skipped = unlinked = 0
+    started = time.monotonic()
+
+    # Ids are read back right after inserting, so replica lag must not be visible
+    with primary_only(), ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        chunks = _chunks(rows, chunk_size)
+        current = _prepare(next(chunks, None), set(), pool)
+        while current is not None:
+            chunk, todo, hashes = current
+            # Queue the next chunk's hashing before inserting this one, so the two overlap
+            current = _prepare(next(chunks, None), {r['username'] for r in todo}, pool)
+
+            with transaction.atomic():
+                unlinked += _insert_chunk(todo, [future.result() for future in hashes])
+
+            created += len(todo)
+            skipped += len(chunk) - len(todo)
+            if on_chunk:
+                on_chunk(created, skipped, unlinked, time.monotonic() - started)
+
+    return created, skipped, unlinked
+
+
+def _prepare(chunk, in_flight, pool):
+    """(chunk, rows to create, password hash futures); ``in_flight`` holds names not inserted yet."""
+    if chunk is None:
+        return None
+    existing = set(
+        User.objects.filter(username__in=[r['username'] for r in chunk])
+        .values_list('username', flat=True)
+    )
+    seen = set(in_flight)
+    todo = []
+    for row in chunk:
+        if row['username'] in existing or row['username'] in seen:
+            continue
+        seen.add(row['username'])
+        todo.append(row)
+    hashes = [pool.submit(_hash_password, r.get('password', '')) for r in todo]
+    return chunk, todo, hashes
+
+
+def _insert_chunk(rows, hashes):
+    """Insert one chunk; returns how many rows named a parent that does not exist."""
+    if not rows:
+        return 0
+
+    User.objects.bulk_create([
+        User(username=row['username'], email=row.get('email', ''), password=password)
+        for row, password in zip(rows, hashes)
+    ])
+    # Re-read ids rather than rely on bulk_create returning them on every backend
+    user_ids = dict(
+        User.objects.filter(username__in=[r['username'] for r in rows]).values_list('username', 'id')
+    )
+
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_ids[row['username']], role='student') for row in rows
+    ])
+    StudentProfile.objects.bulk_create([
+        StudentProfile(
+            user_id=user_ids[row['username']],
+            grade=row.get('grade', ''),
+            learning_style=row.get('learning_style', ''),
+        )
+        for row in rows
+    ])
+
+    parent_names = {row['parent'] for row in rows if row.get('parent')}
+    if not parent_names:
+        return 0
+    parent_ids = dict(
+        ParentProfile.objects.filter(user__username__in=parent_names).values_list('user__username', 'id')
+    )
+    student_ids = dict(
+        StudentProfile.objects.filter(user_id__in=user_ids.values()).values_list('user__username', 'id')
+    )
+    Link = ParentProfile.children.through
+    Link.objects.bulk_create([
+        Link(parentprofile_id=parent_ids[row['parent']], studentprofile_id=student_ids[row['username']])
+        for row in rows
+        if row.get('parent') in parent_ids
+    ], ignore_conflicts=True)
+    return sum(1 for row in rows if row.get('parent') and row['parent'] not in parent_ids)
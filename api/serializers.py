@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.urls import reverse
 from .models import *
 
 # ===== USER SERIALIZER =====
@@ -13,13 +14,11 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'password', 'role', 'profile_role']
 
     def get_profile_role(self, obj):
-        """Safely get profile role"""
+        """Role from the user's profile; None for users without one (select_related('profile') avoids a query)"""
         try:
-            if hasattr(obj, 'profile') and obj.profile:
-                return obj.profile.role
-        except:
-            pass
-        return None
+            return obj.profile.role
+        except UserProfile.DoesNotExist:
+            return None
 
     def create(self, validated_data):
         role = validated_data.pop('role', None)  # Remove role from user creation
@@ -117,12 +116,30 @@ class QuizSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'description', 'chapter', 'time_limit', 'passing_percentage', 'created_by', 'created_at', 'questions']
+        fields = ['id', 'title', 'description', 'chapter', 'time_limit', 'allow_offline', 'passing_percentage', 'created_by', 'created_at', 'questions']
 
 class StudyMaterialSerializer(serializers.ModelSerializer):
+    thumbnail_url = serializers.SerializerMethodField()
+    web_url = serializers.SerializerMethodField()
+
     class Meta:
         model = StudyMaterial
-        fields = ['id', 'topic', 'title', 'material_type', 'content', 'file', 'url', 'rating']
+        fields = ['id', 'topic', 'title', 'material_type', 'content', 'file', 'url', 'rating',
+                  'thumbnail_url', 'web_url']
+
+    def _derivative_url(self, obj, variant):
+        if not obj.preview_ready:
+            return None
+        # Served through the API, like downloads, so previews work without DEBUG media serving
+        url = f"{reverse('material-preview', args=[obj.pk])}?variant={variant}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_thumbnail_url(self, obj):
+        return self._derivative_url(obj, 'thumb')
+
+    def get_web_url(self, obj):
+        return self._derivative_url(obj, 'web')
 
 class StudentQuizAnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -153,3 +170,24 @@ class StudentBadgeSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudentBadge
         fields = ['id', 'student', 'badge', 'earned_at']
+
+class ItemStatisticsSerializer(serializers.ModelSerializer):
+    question_text = serializers.CharField(source='question.question_text', read_only=True)
+    question_type = serializers.CharField(source='question.question_type', read_only=True)
+
+    class Meta:
+        model = ItemStatistics
+        fields = ['question', 'question_text', 'question_type', 'responses', 'p_value', 'discrimination',
+                  'avg_ai_score', 'distractors', 'updated_at']
+
+class ProgressRollupSerializer(serializers.ModelSerializer):
+    subject_name = serializers.CharField(source='subject.name', read_only=True)
+    average_score = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProgressRollup
+        fields = ['subject', 'subject_name', 'period', 'period_start', 'attempts', 'passed',
+                  'average_score', 'best_score']
+
+    def get_average_score(self, obj):
+        return obj.total_score / obj.attempts if obj.attempts else 0
@@ -0,0 +1,64 @@
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from api.mastery import answer_correct, rebuild_topics, record_observation, replay, unpack
+from api.models import (
+    Chapter, Question, Quiz, QuizAttempt, StudentProfile, StudentQuizAnswer, Subject, Topic, TopicMastery,
+)
+
+
+class MasteryReplayTests(TestCase):
+    """Incremental knowledge tracing must end where replay_mastery does for the same stored answers."""
+
+    def setUp(self):
+        self.student = StudentProfile.objects.create(user=User.objects.create_user('student'))
+        subject = Subject.objects.create(name='Biology', description='')
+        chapter = Chapter.objects.create(subject=subject, number=1, title='Plants', description='')
+        self.topics = [Topic.objects.create(chapter=chapter, title=f'topic {i}') for i in range(2)]
+        quiz = Quiz.objects.create(title='Plants', chapter=chapter, time_limit=10)
+        self.attempt = QuizAttempt.objects.create(student=self.student, quiz=quiz)
+        self.questions = [
+            Question.objects.create(topic=topic, question_text=f'question {i}', question_type='short', difficulty='easy')
+            for i, topic in enumerate([self.topics[0], self.topics[0], self.topics[0], self.topics[1]])
+        ]
+
+    def answer(self, question, correct):
+        """Store a graded answer and update mastery the way submit_answer does."""
+        answer, created = StudentQuizAnswer.objects.update_or_create(
+            attempt=self.attempt, question=question,
+            defaults={'student_answer': str(correct), 'ai_score': 100 if correct else 0, 'is_correct': correct},
+        )
+        if created:
+            record_observation(self.student.pk, question.topic_id, answer_correct(answer.is_correct, answer.ai_score))
+        else:
+            rebuild_topics(self.student.pk, [question.topic_id])
+
+    def state(self):
+        return unpack(TopicMastery.objects.get(student=self.student))
+
+    def assert_matches_replay(self):
+        topics, p_known = self.state()
+        replay([self.student.pk])
+        replayed_topics, replayed_p = self.state()
+        np.testing.assert_array_equal(topics, replayed_topics)
+        np.testing.assert_allclose(p_known, replayed_p, rtol=1e-6)
+
+    def test_new_answers_match_replay(self):
+        for question, correct in zip(self.questions, [True, False, True, True]):
+            self.answer(question, correct)
+        self.assert_matches_replay()
+
+    def test_changed_answer_matches_replay(self):
+        first, second, third, other = self.questions
+        for question, correct in [(first, True), (second, False), (other, True), (first, False), (third, True)]:
+            self.answer(question, correct)
+        self.assertEqual(StudentQuizAnswer.objects.count(), 4)
+        self.assert_matches_replay()
+
+    def test_ungraded_answers_are_not_observed(self):
+        first, second = self.questions[:2]
+        self.answer(first, True)
+        StudentQuizAnswer.objects.create(attempt=self.attempt, question=second, student_answer='pending')
+        rebuild_topics(self.student.pk, [first.topic_id])
+        self.assert_matches_replay()
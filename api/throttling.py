@@ -0,0 +1,152 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from .models import UserProfile
+
+_store = None
+_lock = threading.Lock()
+
+
+class LocalBucketStore:
+    """Token buckets in this process's memory. For tests and single-process development."""
+
+    def __init__(self):
+        self.buckets = {}  # key -> (tokens, updated_at)
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        """Take ``cost`` tokens; returns 0 if allowed, else seconds until they are available."""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated_at = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            wait = 0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self.buckets[key] = (tokens, now)
+        return wait
+
+
+# Refill, check and take in one round trip, atomically, on Redis's own clock
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class CacheBucketStore:
+    """Token buckets shared by every worker, kept in the default (Redis) cache."""
+
+    def __init__(self):
+        self.client = cache._cache.get_client(write=True)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1):
+        return float(self.script(keys=[cache.make_key(f'throttle:{key}')], args=[capacity, rate, cost]))
+
+
+def get_bucket_store():
+    """The store named by settings.THROTTLE_BUCKET_STORE, created once per process."""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = import_string(settings.THROTTLE_BUCKET_STORE)()
+    return _store
+
+
+def _reset_store(setting, **kwargs):
+    global _store
+    if setting in ('THROTTLE_BUCKET_STORE', 'CACHES'):
+        _store = None
+
+
+setting_changed.connect(_reset_store)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per user and ``scope``, sized by the user's role from
+    settings.LLM_THROTTLE_BUCKETS, behind a bucket for the whole deployment
+    (settings.LLM_THROTTLE_GLOBAL) that protects the provider quota. Sizes
+    are (burst capacity, tokens refilled per minute).
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        return self.charge(request)
+
+    def charge(self, request, cost=1):
+        """
+        Take ``cost`` tokens from the user's and the global bucket. Views that
+        only learn their LLM usage while running call this themselves; on
+        False, wait() gives the Retry-After.
+        """
+        self.delay = 0
+        if not request.user or not request.user.is_authenticated or cost <= 0:
+            return True
+
+        store = get_bucket_store()
+        size = self.user_size(request.user)
+        if size:
+            self.delay = self.take(store, f'{self.scope}:user:{request.user.pk}', size, cost)
+        size = settings.LLM_THROTTLE_GLOBAL.get(self.scope)
+        if not self.delay and size:
+            self.delay = self.take(store, f'{self.scope}:global', size, cost)
+        return not self.delay
+
+    def capacity(self, user):
+        """The most tokens one request can ever take, or None when unlimited."""
+        sizes = [self.user_size(user), settings.LLM_THROTTLE_GLOBAL.get(self.scope)]
+        capacities = [size[0] for size in sizes if size]
+        return min(capacities) if capacities else None
+
+    def user_size(self, user):
+        buckets = settings.LLM_THROTTLE_BUCKETS.get(self.scope, {})
+        return buckets.get(self.get_role(user)) or buckets.get('default')
+
+    def take(self, store, key, size, cost=1):
+        capacity, per_minute = size
+        return store.take(key, capacity, per_minute / 60, cost)
+
+    def get_role(self, user):
+        try:
+            return user.profile.role
+        except UserProfile.DoesNotExist:
+            return None
+
+    def wait(self):
+        return math.ceil(self.delay) if self.delay else None
+
+
+class LLMGradingThrottle(TokenBucketThrottle):
+    scope = 'llm_grading'
+
+
+class LLMGenerationThrottle(TokenBucketThrottle):
+    scope = 'llm_generation'
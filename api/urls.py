@@ -10,6 +10,7 @@ router.register(r'quizzes', QuizViewSet)
 router.register(r'quiz-attempts', QuizAttemptViewSet, basename='quiz-attempt')
 router.register(r'performance', PerformanceAnalyticsViewSet, basename='performance')
 router.register(r'badges', BadgeViewSet, basename='badge')
+router.register(r'materials', StudyMaterialViewSet, basename='material')
 
 urlpatterns = [
     # Authentication
@@ -20,9 +21,13 @@ urlpatterns = [
     
     # Student
     path('student/dashboard/', StudentDashboardView.as_view(), name='student-dashboard'),
+    path('student/progress/', ProgressChartView.as_view(), name='student-progress'),
+    path('student/weak-topics/', WeakTopicsView.as_view(), name='student-weak-topics'),
+    path('student/recommendations/', RecommendationsView.as_view(), name='student-recommendations'),
     
     # Teacher
     path('teacher/dashboard/', TeacherDashboardView.as_view(), name='teacher-dashboard'),
+    path('teacher/item-analysis/', ItemAnalysisView.as_view(), name='item-analysis'),
     path('teacher/create-question/', CreateQuestionView.as_view(), name='create-question'),
     path('teacher/generate-questions/', GenerateQuestionsView.as_view(), name='generate-questions'),
     
@@ -1,15 +1,35 @@
+import json
+from datetime import timedelta
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled, ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, BasePermission, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.contrib.auth.models import User
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import *
 from .serializers import *
-import google.generativeai as genai
-from decouple import config
-
-genai.configure(api_key=config('GEMINI_API_KEY', default=''))
+from .idempotency import request_key, run_idempotent
+from .derivatives import VARIANTS, derivative_name
+from .downloads import serve_file
+from .dedup import describe_duplicates, find_near_duplicates
+from .grading import pregrade
+from .ai import evaluate_answer, generate_questions
+from .fast_serializers import FastListMixin, FastQuestionSerializer, FastQuizAttemptSerializer
+from .attempts import complete_attempts, expiry_for
+from .bundles import BundleError, build_bundle, prepare_answers, read_token, store_answers
+from .dashboard import get_dashboard, invalidate_dashboards, refresh_dashboard
+from .throttling import LLMGenerationThrottle, LLMGradingThrottle
+from .rollups import update_rollups
+from .mastery import answer_correct, rebuild_topics, record_observation, weak_topics
+from .recommender import get_recommendations
+from eldas.db_router import primary_only
 
 # ===== AUTHENTICATION =====
 class RegisterView(generics.CreateAPIView):
@@ -81,7 +101,90 @@ class StudentDashboardView(generics.RetrieveAPIView):
     serializer_class = StudentProfileSerializer
     
     def get_object(self):
-        return self.request.user.student_profile
+        return StudentProfile.objects.select_related('user__profile').get(user=self.request.user)
+    
+    def retrieve(self, request, *args, **kwargs):
+        # Served from the per-student cache; completing quizzes, badges and profile edits keep it fresh
+        return Response(get_dashboard(self.get_object()))
+
+class StudentScopedMixin:
+    """The requesting student, or with ?student=<id> one of the requesting parent's children."""
+    
+    def get_student(self):
+        student_id = self.request.query_params.get('student')
+        if student_id is None:
+            return get_object_or_404(StudentProfile, user=self.request.user)
+        try:
+            student_id = int(student_id)
+        except ValueError:
+            raise ValidationError({'student': 'Must be a number'})
+        students = StudentProfile.objects.filter(
+            Q(user=self.request.user) | Q(parentprofile__user=self.request.user)
+        ).distinct()
+        return get_object_or_404(students, pk=student_id)
+
+class ProgressChartView(StudentScopedMixin, generics.ListAPIView):
+    """
+    Score buckets per subject for progress charts, read from ProgressRollup only.
+    ?period=day|week (default week), ?since=YYYY-MM-DD, ?subject=<id>, and
+    ?student=<id> for a parent viewing one of their children.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProgressRollupSerializer
+    pagination_class = None
+    DEFAULT_WINDOW = {'day': timedelta(days=90), 'week': timedelta(weeks=52)}
+    
+    def get_queryset(self):
+        params = self.request.query_params
+        period = params.get('period', 'week')
+        if period not in self.DEFAULT_WINDOW:
+            raise ValidationError({'period': 'Use day or week'})
+        since = parse_date(params.get('since', '')) or timezone.localdate() - self.DEFAULT_WINDOW[period]
+        
+        queryset = ProgressRollup.objects.filter(student=self.get_student(), period=period, period_start__gte=since)
+        if params.get('subject'):
+            try:
+                queryset = queryset.filter(subject_id=int(params['subject']))
+            except ValueError:
+                raise ValidationError({'subject': 'Must be a number'})
+        return queryset.select_related('subject').order_by('period_start', 'subject_id')
+
+class WeakTopicsView(StudentScopedMixin, generics.GenericAPIView):
+    """Weakest topics by knowledge-tracing mastery: ?limit=<n> (default 5), ?student=<id> for parents."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params.get('limit', 5)), 50)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be a number'})
+        weak = weak_topics(self.get_student(), limit)
+        topics = Topic.objects.select_related('chapter').in_bulk([topic_id for topic_id, _ in weak])
+        return Response([
+            {
+                'topic': topic_id,
+                'topic_title': topics[topic_id].title,
+                'chapter': topics[topic_id].chapter_id,
+                'chapter_title': topics[topic_id].chapter.title,
+                'mastery': p_known,
+            }
+            for topic_id, p_known in weak if topic_id in topics
+        ])
+
+class RecommendationsView(StudentScopedMixin, generics.GenericAPIView):
+    """Precomputed study material recommendations, best first (?student=<id> for parents)."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        recommendations = get_recommendations(self.get_student().pk)
+        materials = StudyMaterial.objects.in_bulk([material_id for material_id, _ in recommendations])
+        data = []
+        for material_id, score in recommendations:
+            if material_id in materials:
+                item = StudyMaterialSerializer(materials[material_id], context={'request': request}).data
+                item['score'] = score
+                data.append(item)
+        return Response(data)
 
 class SubjectViewSet(viewsets.ModelViewSet):
     queryset = Subject.objects.all()
@@ -93,34 +196,59 @@ class ChapterViewSet(viewsets.ModelViewSet):
     serializer_class = ChapterSerializer
     permission_classes = [IsAuthenticated]
 
-class QuestionViewSet(viewsets.ModelViewSet):
+class QuestionViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
+    fast_serializer_class = FastQuestionSerializer
     permission_classes = [IsAuthenticated]
 
 class QuizViewSet(viewsets.ModelViewSet):
-    queryset = Quiz.objects.all()
+    queryset = Quiz.objects.order_by('id')
     serializer_class = QuizSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # QuizSerializer nests every question with its options and answer
+            queryset = queryset.prefetch_related('questions__question__options', 'questions__question__answer')
+        return queryset
+    
     @action(detail=True, methods=['post'])
     def start_quiz(self, request, pk=None):
         quiz = self.get_object()
         student = request.user.student_profile
         
+        offline = str(request.data.get('offline', request.query_params.get('offline', ''))).lower() in ('1', 'true')
+        if offline and not quiz.allow_offline:
+            # Offline answers carry no verifiable time, so the teacher has to opt in
+            return Response({'error': 'This quiz cannot be taken offline'}, status=status.HTTP_403_FORBIDDEN)
+        expires_at = expiry_for(quiz)
+        
         attempt = QuizAttempt.objects.create(
             student=student,
-            quiz=quiz
+            quiz=quiz,
+            expires_at=expires_at,
+            # The upload may only arrive once the client is back online; the sweeper waits for it.
+            # Online submissions still stop at expires_at.
+            sync_deadline=expires_at + timedelta(seconds=settings.QUIZ_OFFLINE_SYNC_WINDOW_SECONDS) if offline else None
         )
+        # recent_attempts lists open attempts too
+        invalidate_dashboards([student.pk])
         
-        return Response({
+        data = {
             'attempt_id': attempt.id,
             'quiz_id': quiz.id,
             'time_limit': quiz.time_limit
-        }, status=status.HTTP_201_CREATED)
+        }
+        if offline:
+            data['bundle'] = build_bundle(attempt)
+        return Response(data, status=status.HTTP_201_CREATED)
 
-class QuizAttemptViewSet(viewsets.ModelViewSet):
+class QuizAttemptViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
+    """A student's own attempts. They are opened only by start_quiz, which sets the time limit."""
     serializer_class = QuizAttemptSerializer
+    fast_serializer_class = FastQuizAttemptSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
@@ -128,66 +256,125 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def submit_answer(self, request, pk=None):
-        attempt = self.get_object()
         question_id = request.data.get('question_id')
         student_answer = request.data.get('answer')
         
+        # Clients retry on timeouts; collapse retries onto one grading call
+        key, client_key = request_key(request, 'submit_answer', pk, question_id, student_answer)
+        return run_idempotent(
+            request, key,
+            lambda: self._submit_answer(question_id, student_answer),
+            keep_response=client_key,
+        )
+    
+    def _submit_answer(self, question_id, student_answer):
+        attempt = self.get_object()
+        if not attempt.accepts_answers():
+            return Response({'error': 'This attempt is closed'}, status=status.HTTP_409_CONFLICT)
         question = Question.objects.get(id=question_id)
-        answer = question.answer
         
-        # AI Evaluation using Gemini
-        model = genai.GenerativeModel('gemini-pro')
-        prompt = f"""
-        Question: {question.question_text}
-        Model Answer: {answer.correct_answer}
-        Student Answer: {student_answer}
+        existing = StudentQuizAnswer.objects.filter(attempt=attempt, question=question).first()
+        if existing and existing.student_answer == student_answer and existing.ai_score is not None:
+            # Same answer already graded: replay it instead of paying for another LLM call
+            return Response({
+                'score': existing.ai_score,
+                'feedback': existing.ai_feedback,
+                'is_correct': existing.is_correct
+            }, status=status.HTTP_200_OK)
         
-        Evaluate the student's answer and provide:
-        1. A score from 0-100
-        2. Feedback
-        3. Whether it's correct (true/false)
+        # Clear-cut short answers are scored locally; only uncertain ones cost an LLM call and a grading token
+        result = pregrade(question, student_answer)
+        if result is None:
+            throttle = LLMGradingThrottle()
+            if not throttle.charge(self.request):
+                raise Throttled(wait=throttle.wait())
+            result = evaluate_answer(question, student_answer)
         
-        Respond in JSON format:
-        {{"score": 85, "feedback": "Good answer", "is_correct": true}}
-        """
-        
-        response = model.generate_content(prompt)
-        import json
-        try:
-            result = json.loads(response.text)
-        except:
-            result = {'score': 50, 'feedback': 'Answer evaluated', 'is_correct': False}
-        
-        quiz_answer = StudentQuizAnswer.objects.create(
+        answer, created = StudentQuizAnswer.objects.update_or_create(
             attempt=attempt,
             question=question,
-            student_answer=student_answer,
-            ai_score=result.get('score', 50),
-            ai_feedback=result.get('feedback', ''),
-            is_correct=result.get('is_correct', False)
+            defaults={
+                'student_answer': student_answer,
+                'ai_score': result.get('score', 50),
+                'ai_feedback': result.get('feedback', ''),
+                'is_correct': result.get('is_correct', False)
+            }
         )
+        if created:
+            record_observation(attempt.student_id, question.topic_id, answer_correct(answer.is_correct, answer.ai_score))
+        else:
+            # A changed answer replaces its earlier observation instead of adding a second one
+            rebuild_topics(attempt.student_id, [question.topic_id])
         
         return Response(result, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['post'])
-    def complete_quiz(self, request, pk=None):
-        from django.utils import timezone
+    def sync_answers(self, request, pk=None):
+        """
+        Take a whole offline bundle upload: {token, answers: [{question_id, answer}], complete}.
+        Answers the local pre-grader can't settle are graded in the background (202);
+        poll the attempt for their scores.
+        """
+        # Retries after a dropped connection replay the stored result instead of grading again
+        key, _ = request_key(request, 'sync_answers', pk, request.data.get('token'),
+                             json.dumps(request.data.get('answers'), sort_keys=True, default=str),
+                             request.data.get('complete'))
+        return run_idempotent(request, key, lambda: self._sync_answers(request))
+    
+    def _sync_answers(self, request):
+        data = request.data
         attempt = self.get_object()
+        answers = data.get('answers')
+        if not isinstance(answers, list) or len(answers) > settings.QUIZ_SYNC_MAX_ANSWERS:
+            return Response({'error': f'answers must be a list of at most {settings.QUIZ_SYNC_MAX_ANSWERS} items'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            allowed = read_token(str(data.get('token', '')), attempt)
+        except BundleError as e:
+            return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        if not attempt.accepts_sync():
+            return Response({'error': 'This attempt is closed'}, status=status.HTTP_409_CONFLICT)
+        
+        try:
+            prepared = prepare_answers(attempt, allowed, answers)
+        except BundleError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        answers = attempt.answers.all()
-        total_score = sum(a.ai_score or 0 for a in answers)
-        total_marks = attempt.quiz.questions.count()
-        percentage = (total_score / (total_marks * 100)) * 100 if total_marks > 0 else 0
+        # Each answer sent to the LLM costs a grading token, as it would through submit_answer
+        escalated = sum(1 for _, _, result, changed in prepared if result is None and changed)
+        throttle = LLMGradingThrottle()
+        capacity = throttle.capacity(request.user)
+        if capacity is not None and escalated > capacity:
+            return Response({'error': f'This upload needs {escalated} AI gradings; sync at most {capacity} at a time'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if not throttle.charge(request, escalated):
+            raise Throttled(wait=throttle.wait())
         
-        attempt.score = percentage
-        attempt.completed_at = timezone.now()
-        attempt.save()
+        results = store_answers(attempt, prepared)
+        pending = sum(1 for result in results if result.get('pending'))
+        response = {'results': results, 'pending': pending}
+        if str(data.get('complete', '')).lower() in ('1', 'true'):
+            # With answers pending, the score is provisional; it is recomputed as their grades land
+            response.update(self._complete_quiz(attempt))
+        return Response(response, status=status.HTTP_202_ACCEPTED if pending else status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def complete_quiz(self, request, pk=None):
+        return Response(self._complete_quiz(self.get_object()), status=status.HTTP_200_OK)
+    
+    def _complete_quiz(self, attempt):
+        # Scored in SQL by the same expression the expiry sweeper uses; no-op if already completed
+        if complete_attempts(QuizAttempt.objects.filter(pk=attempt.pk), timezone.now()):
+            update_rollups([attempt.pk])
+            refresh_dashboard(attempt.student_id)
+        with primary_only():
+            attempt.refresh_from_db(fields=['score', 'completed_at'])
         
-        return Response({
+        return {
             'score': attempt.score,
-            'total_questions': total_marks,
-            'passed': percentage >= attempt.quiz.passing_percentage
-        }, status=status.HTTP_200_OK)
+            'total_questions': attempt.quiz.questions.count(),
+            'passed': attempt.score >= attempt.quiz.passing_percentage
+        }
 
 class PerformanceAnalyticsViewSet(viewsets.ModelViewSet):
     serializer_class = PerformanceAnalyticsSerializer
@@ -202,17 +389,71 @@ class BadgeViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def my_badges(self, request):
-        badges = StudentBadge.objects.filter(student__user=request.user)
+        badges = StudentBadge.objects.filter(student__user=request.user).select_related('badge')
         serializer = StudentBadgeSerializer(badges, many=True)
         return Response(serializer.data)
 
+class IsTeacherOrReadOnly(BasePermission):
+    """Anyone signed in can read; only teachers can upload, replace or delete."""
+    
+    def has_permission(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return TeacherProfile.objects.filter(user=request.user).exists()
+
+class StudyMaterialViewSet(viewsets.ModelViewSet):
+    serializer_class = StudyMaterialSerializer
+    permission_classes = [IsAuthenticated, IsTeacherOrReadOnly]
+    
+    def get_queryset(self):
+        queryset = StudyMaterial.objects.order_by('id')
+        topic = self.request.query_params.get('topic')
+        if topic:
+            queryset = queryset.filter(topic_id=topic)
+        return queryset
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        material = self.get_object()
+        if not material.file:
+            return Response({'error': 'This material has no file'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            return serve_file(request, material.file.storage, material.file.name)
+        except FileNotFoundError:
+            return Response({'error': 'This material\'s file is missing'}, status=status.HTTP_404_NOT_FOUND)
+    
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """A precomputed preview image, ``?variant=thumb`` (default) or ``web``."""
+        material = self.get_object()
+        variant = request.query_params.get('variant', 'thumb')
+        if variant not in VARIANTS:
+            raise ValidationError({'variant': f'Choose one of: {", ".join(VARIANTS)}'})
+        if not material.preview_ready:
+            return Response({'error': 'This material has no preview'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            return serve_file(request, default_storage, derivative_name(material.content_hash, variant))
+        except FileNotFoundError:
+            return Response({'error': 'This material\'s preview is missing'}, status=status.HTTP_404_NOT_FOUND)
+
 # ===== TEACHER ENDPOINTS =====
 class TeacherDashboardView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = TeacherProfileSerializer
     
     def get_object(self):
-        return self.request.user.teacher_profile
+        return get_object_or_404(TeacherProfile.objects.select_related('user__profile'), user=self.request.user)
+
+class ItemAnalysisView(generics.ListAPIView):
+    """Item statistics for the teacher's own questions, as last computed by compute_item_stats."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ItemStatisticsSerializer
+    
+    def get_queryset(self):
+        return (ItemStatistics.objects
+                .filter(question__created_by__user=self.request.user)
+                .select_related('question')
+                .order_by('question_id'))
 
 class CreateQuestionView(generics.CreateAPIView):
     serializer_class = QuestionSerializer
@@ -220,39 +461,30 @@ class CreateQuestionView(generics.CreateAPIView):
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user.teacher_profile)
+    
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # Flag near-identical questions already in the bank
+        matches = find_near_duplicates(response.data['question_text'], exclude_id=response.data['id'])
+        response.data['near_duplicates'] = describe_duplicates(matches)
+        return response
 
 class GenerateQuestionsView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [LLMGenerationThrottle]
     
     def create(self, request, *args, **kwargs):
         # AI generates questions from textbook image
-        model = genai.GenerativeModel('gemini-pro')
-        
         text_content = request.data.get('content', '')
         difficulty = request.data.get('difficulty', 'medium')
         
-        prompt = f"""
-        Generate 5 multiple-choice questions from this content:
+        questions = generate_questions(text_content, difficulty)
         
-        {text_content}
-        
-        Difficulty: {difficulty}
-        
-        For each question provide:
-        - Question text
-        - 4 options (A, B, C, D)
-        - Correct answer
-        - Explanation
-        
-        Return as JSON array.
-        """
-        
-        response = model.generate_content(prompt)
-        import json
-        try:
-            questions = json.loads(response.text)
-        except:
-            questions = []
+        # Flag generated questions that are already in the bank
+        for item in questions if isinstance(questions, list) else []:
+            if isinstance(item, dict):
+                text = item.get('question_text') or item.get('question') or ''
+                item['near_duplicates'] = describe_duplicates(find_near_duplicates(str(text)))
         
         return Response(questions, status=status.HTTP_201_CREATED)
 
@@ -262,4 +494,6 @@ class ParentDashboardView(generics.RetrieveAPIView):
     serializer_class = ParentProfileSerializer
     
     def get_object(self):
-        return self.request.user.parent_profile
+        return get_object_or_404(
+            ParentProfile.objects.select_related('user__profile').prefetch_related('children'), user=self.request.user
+        )
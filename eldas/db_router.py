@@ -0,0 +1,110 @@
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_primary = ContextVar('use_primary', default=False)
+_health = {}  # alias -> (healthy, checked_at)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+@contextmanager
+def primary_only():
+    """Send every read inside the block to the primary."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def _is_healthy(alias):
+    healthy, checked_at = _health.get(alias, (True, 0))
+    if time.monotonic() - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return healthy
+    connection = connections[alias]
+    try:
+        # A real round trip: ensure_connection() is a no-op on a kept-alive (CONN_MAX_AGE) connection
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        healthy = True
+    except DatabaseError:
+        healthy = False
+        try:
+            connection.close()  # reconnect from scratch on the next check
+        except DatabaseError:
+            connection.connection = None
+    _health[alias] = (healthy, time.monotonic())
+    return healthy
+
+
+class ReplicaRouter:
+    """
+    Send reads to a healthy replica and everything else to ``default``.
+
+    Reads fall back to the primary inside primary_only() blocks, during
+    unsafe requests, and for a short window after the same client wrote
+    (see ReplicaPinningMiddleware), so clients always see their own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_primary.get():
+            return 'default'
+        healthy = [alias for alias in replica_aliases() if _is_healthy(alias)]
+        return random.choice(healthy) if healthy else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any alias can be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Route a request's reads to the primary when it writes, or when the same
+    client wrote within REPLICA_PIN_SECONDS.
+
+    Clients are identified by their Authorization header (or session cookie)
+    because JWT authentication only runs inside the view, after routing has
+    to be decided.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _pin_key(self, request):
+        credential = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credential:
+            return None
+        return 'replica-pin:' + hashlib.sha1(credential.encode()).hexdigest()
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        pin_key = self._pin_key(request)
+        writes = request.method not in SAFE_METHODS
+        token = _use_primary.set(writes or bool(pin_key and cache.get(pin_key)))
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+
+        if writes and pin_key and response.status_code < 400:
+            cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+        return response
@@ -32,6 +32,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'eldas.db_router.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,9 +63,10 @@ WSGI_APPLICATION = 'eldas.wsgi.application'
 
 # CHANGE: Updated for Render - use PostgreSQL DATABASE_URL if available
 import dj_database_url
+CONN_MAX_AGE = config('CONN_MAX_AGE', default=60, cast=int)  # seconds to keep DB connections open between requests
 if config('DATABASE_URL', default=None):
     DATABASES = {
-        'default': dj_database_url.config(default=config('DATABASE_URL'))
+        'default': dj_database_url.config(default=config('DATABASE_URL'), conn_max_age=CONN_MAX_AGE, conn_health_checks=True)
     }
 else:
     DATABASES = {
@@ -74,6 +76,31 @@ else:
         }
     }
 
+# Optional read replicas: comma-separated URLs, e.g. postgres://... or sqlite:////tmp/replica.sqlite3
+DATABASE_REPLICA_URLS = [url.strip() for url in config('DATABASE_REPLICA_URLS', default='').split(',') if url.strip()]
+for index, url in enumerate(DATABASE_REPLICA_URLS):
+    DATABASES[f'replica_{index}'] = dj_database_url.parse(url, conn_max_age=CONN_MAX_AGE, conn_health_checks=True)
+    DATABASES[f'replica_{index}']['TEST'] = {'MIRROR': 'default'}
+if DATABASE_REPLICA_URLS:
+    DATABASE_ROUTERS = ['eldas.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)  # read-your-writes window after a write
+REPLICA_HEALTH_CHECK_INTERVAL = config('REPLICA_HEALTH_CHECK_INTERVAL', default=10, cast=int)
+
+# Shared cache for replica pinning and precomputed data; falls back to per-process memory
+if config('REDIS_URL', default=None):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -94,6 +121,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Study material downloads
+MATERIAL_CACHE_MAX_AGE = config('MATERIAL_CACHE_MAX_AGE', default=3600, cast=int)
+MATERIAL_SENDFILE_HEADER = config('MATERIAL_SENDFILE_HEADER', default='')  # e.g. X-Accel-Redirect behind nginx
+MATERIAL_SENDFILE_PREFIX = config('MATERIAL_SENDFILE_PREFIX', default='/protected-media/')
+DERIVATIVE_WORKERS = config('DERIVATIVE_WORKERS', default=2, cast=int)  # threads building thumbnails/previews
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -102,6 +135,11 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
 }
@@ -117,6 +155,54 @@ SIMPLE_JWT = {
 
 
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+AI_PROVIDER = config('AI_PROVIDER', default='api.ai.GeminiProvider')  # dotted path, loaded on first AI call
+AI_MODEL = config('AI_MODEL', default='gemini-pro')
+PREGRADER_CONFIDENCE_THRESHOLD = config('PREGRADER_CONFIDENCE_THRESHOLD', default=0.75, cast=float)  # below this, short answers go to the LLM
+
+# --- LLM THROTTLING ---
+# Token buckets as (burst capacity, tokens refilled per minute), per endpoint scope and user role
+LLM_THROTTLE_BUCKETS = {
+    'llm_grading': {'student': (30, 12), 'default': (10, 4)},     # one per answer sent to the LLM by submit_answer or sync_answers
+    'llm_generation': {'teacher': (5, 2), 'default': (1, 0.5)},   # teacher/generate-questions/
+}
+LLM_THROTTLE_GLOBAL = {  # shared by every user; keep under the provider's quota
+    'llm_grading': (300, 240),
+    'llm_generation': (30, 20),
+}
+THROTTLE_BUCKET_STORE = config(
+    'THROTTLE_BUCKET_STORE',
+    default='api.throttling.CacheBucketStore' if config('REDIS_URL', default=None) else 'api.throttling.LocalBucketStore',
+)  # CacheBucketStore shares buckets across workers through Redis
+
+
+# --- IDEMPOTENCY ---
+IDEMPOTENCY_WAIT_TIMEOUT = config('IDEMPOTENCY_WAIT_TIMEOUT', default=30, cast=int)  # seconds a duplicate waits for the first request
+IDEMPOTENCY_STALE_AFTER = config('IDEMPOTENCY_STALE_AFTER', default=120, cast=int)  # seconds before an in-flight key is considered abandoned
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)  # seconds stored responses are replayed
+
+# --- QUIZ ATTEMPTS ---
+QUIZ_SUBMIT_GRACE_SECONDS = config('QUIZ_SUBMIT_GRACE_SECONDS', default=15, cast=int)  # answers accepted this long after the time limit
+SWEEPER_BATCH_SIZE = config('SWEEPER_BATCH_SIZE', default=500, cast=int)  # expired attempts completed per UPDATE
+STUDENT_DASHBOARD_CACHE_TTL = config('STUDENT_DASHBOARD_CACHE_TTL', default=600, cast=int)  # seconds; writes refresh or drop it sooner
+QUIZ_OFFLINE_SYNC_WINDOW_SECONDS = config('QUIZ_OFFLINE_SYNC_WINDOW_SECONDS', default=900, cast=int)  # offline bundles (quizzes with allow_offline) may sync this long after the time limit; online answers still stop at it
+QUIZ_SYNC_MAX_ANSWERS = config('QUIZ_SYNC_MAX_ANSWERS', default=200, cast=int)  # answers accepted per sync upload
+SYNC_GRADING_WORKERS = config('SYNC_GRADING_WORKERS', default=2, cast=int)  # threads grading offline uploads with the AI provider
+SYNC_GRADING_RETRY_AFTER = config('SYNC_GRADING_RETRY_AFTER', default=300, cast=int)  # seconds before grade_pending_answers picks up an answer left ungraded
+
+# --- TOPIC MASTERY (Bayesian Knowledge Tracing) ---
+BKT_PARAMS = {
+    'p_init': 0.2,   # chance a topic is already known before any answer
+    'p_learn': 0.15, # chance of learning it after each answer
+    'p_guess': 0.2,  # correct without knowing it
+    'p_slip': 0.1,   # wrong despite knowing it
+}
+BKT_MASTERED = config('BKT_MASTERED', default=0.95, cast=float)  # topics at or above this are not reported as weak
+
+# --- STUDY MATERIAL RECOMMENDATIONS ---
+RECOMMENDATIONS_PER_STUDENT = config('RECOMMENDATIONS_PER_STUDENT', default=10, cast=int)
+RECOMMENDATION_MATERIALS_PER_TOPIC = config('RECOMMENDATION_MATERIALS_PER_TOPIC', default=5, cast=int)  # best-ranked materials considered per weak topic
+RECOMMENDATION_CACHE_TTL = config('RECOMMENDATION_CACHE_TTL', default=3600, cast=int)  # seconds; refresh_recommendations overwrites sooner
+MATERIAL_TYPE_WEIGHTS = {'video': 1.0, 'note': 0.9, 'pdf': 0.85, 'image': 0.7, 'link': 0.6}  # multiplies rating / 5
  
 # --- CORS SETTINGS ---
 CORS_ALLOWED_ORIGINS = [
@@ -126,6 +212,7 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = [
     "content-type",
     "authorization",
+    "idempotency-key",                     # retried answer submissions and offline syncs
 ]
 
 # --- CSRF SETTINGS ---
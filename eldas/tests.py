@@ -0,0 +1,66 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+
+from eldas import db_router
+from eldas.db_router import ReplicaRouter, primary_only
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """The router against two real SQLite files: a primary and one replica."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        databases = {
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(self.tmp.name, f'{alias}.sqlite3')}
+            for alias in (DEFAULT_DB_ALIAS, 'replica_0')
+        }
+        self.connections = ConnectionHandler(databases)
+        self.addCleanup(self.connections.close_all)
+        overrides = override_settings(DATABASES=databases, REPLICA_HEALTH_CHECK_INTERVAL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for patcher in (
+            mock.patch.object(db_router, 'connections', self.connections),
+            mock.patch.dict(db_router._health, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(None), 'replica_0')
+        self.assertEqual(self.router.db_for_write(None), DEFAULT_DB_ALIAS)
+
+    def test_primary_only_reads_from_primary(self):
+        with primary_only():
+            self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+
+    def test_replica_failing_after_connecting_falls_back_and_recovers(self):
+        replica = self.connections['replica_0']
+        self.assertEqual(self.router.db_for_read(None), 'replica_0')
+        self.assertIsNotNone(replica.connection)
+
+        # The kept-alive connection dies underneath Django, which still holds it
+        replica.connection.close()
+        self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+        self.assertIsNone(replica.connection)
+
+        # The next check reconnects and routes reads back to the replica
+        self.assertEqual(self.router.db_for_read(None), 'replica_0')
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        self.connections['replica_0'].settings_dict['NAME'] = os.path.join(self.tmp.name, 'missing', 'db.sqlite3')
+        self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+
+    def test_health_is_cached_between_checks(self):
+        with override_settings(REPLICA_HEALTH_CHECK_INTERVAL=60):
+            self.assertEqual(self.router.db_for_read(None), 'replica_0')
+            self.connections['replica_0'].connection.close()
+            # Still trusted until the interval passes
+            self.assertEqual(self.router.db_for_read(None), 'replica_0')